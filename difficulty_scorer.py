@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Keystroke Difficulty Scorer for Medical Terms
+医療用語の打鍵難易度スコア計算プログラム
+
+用語CSVの全行について打鍵数・打ちにくい連続打鍵・左右交互打鍵・漢字の希少度を
+NumPy配列でまとめて計算し、0〜100の difficulty 列を追加します。
+difficulty はデッキ内の順位（パーセンタイル）なので、script.js の
+DifficultyManager のプリセットはこの値の範囲で用語を振り分けます。
+
+使用方法:
+    python3 difficulty_scorer.py input.csv [output.csv]
+
+依存関係:
+    pip install numpy
+"""
+
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    if __name__ == "__main__":
+        print("numpyがインストールされていません。")
+        print("以下のコマンドでインストールしてください:")
+        print("   pip install numpy")
+        sys.exit(1)
+    raise
+
+from file_utils import atomic_write
+
+
+class DifficultyScorer:
+    """用語の打鍵難易度をデッキ全体まとめて計算するクラス"""
+
+    # QWERTY配列のホームポジションでの担当指（0〜3: 左手小指〜人差し指, 4〜7: 右手人差し指〜小指）
+    FINGERS = {
+        0: "qaz",
+        1: "wsx",
+        2: "edc",
+        3: "rfvtgb",
+        4: "yhnujm",
+        5: "ik,",
+        6: "ol.",
+        7: "p;/-'",
+    }
+
+    # script.js の RomajiPatterns.alternativePatterns で受け付ける、より短い代替入力
+    # （alternativePatterns を変更した場合はこの表も合わせて更新すること）
+    SHORTCUTS = {
+        'shi': 'si',
+        'chi': 'ti',
+        'tsu': 'tu',
+        'wo': 'o',
+    }
+
+    # 各特徴量（デッキ内で標準化した値）の重み
+    WEIGHTS = {
+        'keystrokes': 1.0,     # 最短打鍵数
+        'awkward': 0.5,        # 同じ指で異なるキーを続けて打つ回数
+        'alternation': -0.3,   # 左右交互打鍵の割合（高いほど打ちやすい）
+        'rarity': 0.5,         # 漢字の希少度
+    }
+
+    # 配列化する最大文字数（これより長い部分は切り捨て）
+    MAX_ROMAJI_LENGTH = 40
+    MAX_JAPANESE_LENGTH = 20
+
+    # 漢字（CJK統合漢字）のコードポイント範囲
+    KANJI_START = 0x4E00
+    KANJI_END = 0x9FFF
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        """
+        初期化
+
+        Args:
+            weights (Dict[str, float], optional): 特徴量の重み（WEIGHTSを上書き）
+        """
+        self.weights = dict(self.WEIGHTS)
+        if weights:
+            self.weights.update(weights)
+
+        # ASCII文字 → 担当指・手の変換表（-1は対象外の文字）
+        self.finger_table = np.full(128, -1, dtype=np.int8)
+        for finger, keys in self.FINGERS.items():
+            for key in keys:
+                self.finger_table[ord(key)] = finger
+        self.hand_table = np.where(self.finger_table >= 0, self.finger_table // 4, -1).astype(np.int8)
+
+    @staticmethod
+    def encode(texts: List[str], width: int) -> np.ndarray:
+        """
+        文字列リストを (用語数, width) のコードポイント配列に変換
+
+        Args:
+            texts (List[str]): 文字列リスト
+            width (int): 1行の文字数（不足分は0で埋め、超過分は切り捨て）
+
+        Returns:
+            np.ndarray: uint32のコードポイント配列
+        """
+        if not texts:
+            return np.zeros((0, width), dtype=np.uint32)
+        return np.asarray(texts, dtype=f'U{width}').view(np.uint32).reshape(len(texts), -1)
+
+    @staticmethod
+    def count_substring(codes: np.ndarray, pattern: str) -> np.ndarray:
+        """
+        各行に含まれる部分文字列の出現回数
+
+        Args:
+            codes (np.ndarray): コードポイント配列
+            pattern (str): 部分文字列
+
+        Returns:
+            np.ndarray: 行ごとの出現回数
+        """
+        span = codes.shape[1] - len(pattern) + 1
+        if span <= 0:
+            return np.zeros(codes.shape[0], dtype=np.int32)
+        match = np.ones((codes.shape[0], span), dtype=bool)
+        for offset, char in enumerate(pattern):
+            match &= codes[:, offset:offset + span] == ord(char)
+        return match.sum(axis=1)
+
+    def keystroke_counts(self, codes: np.ndarray) -> np.ndarray:
+        """
+        受け付けるローマ字入力のうち最短のものの打鍵数
+
+        Args:
+            codes (np.ndarray): ローマ字のコードポイント配列
+
+        Returns:
+            np.ndarray: 行ごとの最短打鍵数
+        """
+        counts = (codes != 0).sum(axis=1)
+        for standard, shortcut in self.SHORTCUTS.items():
+            counts -= self.count_substring(codes, standard) * (len(standard) - len(shortcut))
+        return counts
+
+    def bigram_features(self, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        打ちにくい連続打鍵の回数と左右交互打鍵の割合
+
+        Args:
+            codes (np.ndarray): ローマ字のコードポイント配列
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 同指異鍵の連続打鍵数, 左右交互打鍵の割合
+        """
+        ascii_codes = np.where(codes < 128, codes, 0)
+        fingers = self.finger_table[ascii_codes]
+        hands = self.hand_table[ascii_codes]
+
+        valid = (fingers[:, :-1] >= 0) & (fingers[:, 1:] >= 0)
+        awkward = valid & (fingers[:, :-1] == fingers[:, 1:]) & (codes[:, :-1] != codes[:, 1:])
+        alternating = valid & (hands[:, :-1] != hands[:, 1:])
+
+        pairs = valid.sum(axis=1)
+        alternation = alternating.sum(axis=1) / np.maximum(pairs, 1)
+        return awkward.sum(axis=1), alternation
+
+    def kanji_rarity(self, codes: np.ndarray) -> np.ndarray:
+        """
+        デッキ内での漢字の出現頻度から求めた希少度（情報量）の平均
+
+        Args:
+            codes (np.ndarray): 用語のコードポイント配列
+
+        Returns:
+            np.ndarray: 行ごとの平均希少度（漢字を含まない用語は0）
+        """
+        is_kanji = (codes >= self.KANJI_START) & (codes <= self.KANJI_END)
+        size = self.KANJI_END - self.KANJI_START + 1
+        index = np.where(is_kanji, codes.astype(np.int32) - self.KANJI_START, 0)
+
+        counts = np.bincount(index[is_kanji], minlength=size)
+        total = max(int(counts.sum()), 1)
+        information = -np.log(np.maximum(counts, 1) / total)
+
+        kanji_count = is_kanji.sum(axis=1)
+        rarity_sum = np.where(is_kanji, information[index], 0.0).sum(axis=1)
+        return rarity_sum / np.maximum(kanji_count, 1)
+
+    def features(self, romaji: List[str], japanese: List[str]) -> Dict[str, np.ndarray]:
+        """
+        デッキ全体の特徴量を計算
+
+        Args:
+            romaji (List[str]): ローマ字のリスト
+            japanese (List[str]): 用語のリスト
+
+        Returns:
+            Dict[str, np.ndarray]: 特徴量名 → 行ごとの値
+        """
+        romaji_codes = self.encode([text.lower() for text in romaji], self.MAX_ROMAJI_LENGTH)
+        japanese_codes = self.encode(japanese, self.MAX_JAPANESE_LENGTH)
+
+        awkward, alternation = self.bigram_features(romaji_codes)
+        return {
+            'keystrokes': self.keystroke_counts(romaji_codes).astype(np.float64),
+            'awkward': awkward.astype(np.float64),
+            'alternation': alternation,
+            'rarity': self.kanji_rarity(japanese_codes),
+        }
+
+    def score(self, romaji: List[str], japanese: List[str]) -> np.ndarray:
+        """
+        難易度スコア（デッキ内のパーセンタイル順位 0〜100）を計算
+
+        Args:
+            romaji (List[str]): ローマ字のリスト
+            japanese (List[str]): 用語のリスト
+
+        Returns:
+            np.ndarray: 行ごとの難易度（int）
+        """
+        count = len(romaji)
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        raw = np.zeros(count, dtype=np.float64)
+        for name, values in self.features(romaji, japanese).items():
+            std = values.std()
+            if std > 0:
+                raw += self.weights[name] * (values - values.mean()) / std
+
+        # 同じスコアは同じ順位になるようにソート済み配列で位置を求める
+        rank = np.searchsorted(np.sort(raw), raw, side='left')
+        return np.rint(rank * 100 / max(count - 1, 1)).astype(np.int64)
+
+    def add_difficulty(self, csv_data: List[Dict[str, str]]):
+        """
+        CSVデータの各行に difficulty 列を追加
+
+        Args:
+            csv_data (List[Dict[str, str]]): CSVデータ（その場で更新）
+        """
+        scores = self.score(
+            [row.get('romaji', '') for row in csv_data],
+            [row.get('japanese', '') for row in csv_data],
+        )
+        for row, value in zip(csv_data, scores.tolist()):
+            row['difficulty'] = str(value)
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(
+        description="医療用語CSVに打鍵難易度（difficulty列）を追加",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  python3 difficulty_scorer.py medical-terms.csv
+  python3 difficulty_scorer.py merged.csv scored.csv
+
+difficulty列:
+  0（易しい）〜100（難しい）のデッキ内順位。
+  script.js の難易度プリセットはこの値の範囲で用語を選びます。
+        """
+    )
+
+    parser.add_argument(
+        'input_csv',
+        help='入力CSVファイルのパス'
+    )
+
+    parser.add_argument(
+        'output_csv',
+        nargs='?',
+        help='出力CSVファイルのパス (デフォルト: 入力ファイルを上書き)'
+    )
+
+    args = parser.parse_args()
+
+    # ファイル存在確認
+    if not Path(args.input_csv).exists():
+        print(f"入力ファイルが見つかりません: {args.input_csv}")
+        sys.exit(1)
+
+    with open(args.input_csv, 'r', encoding='utf-8-sig', newline='') as csvfile:
+        reader = csv.DictReader(csvfile)
+        fieldnames = list(reader.fieldnames or [])
+        csv_data = list(reader)
+
+    if 'difficulty' not in fieldnames:
+        fieldnames.append('difficulty')
+
+    started = time.perf_counter()
+    DifficultyScorer().add_difficulty(csv_data)
+    print(f"{len(csv_data)}個の用語の難易度を計算しました ({time.perf_counter() - started:.2f}秒)")
+
+    # 配信中のCSVを上書きしても書きかけの状態で読まれないよう一時ファイル経由で保存
+    output_csv = args.output_csv or args.input_csv
+    with atomic_write(output_csv, 'w', encoding='utf-8', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(csv_data)
+
+    print(f"CSVファイルを保存しました: {output_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+File Utilities
+ファイル書き出し用の共通処理
+
+CSV・スナップショットなどを書き込み途中の状態で読まれないように、
+同じディレクトリの一時ファイルに書いてから置き換えます。
+
+依存関係:
+    なし（標準ライブラリのみ）
+"""
+
+import contextlib
+import os
+import stat
+import tempfile
+from typing import IO, Iterator
+
+# 新規ファイルの権限に使うumask（os.umaskは取得と設定が同時のため、
+# 他のスレッドがファイルを作成している最中に変更しないよう起動時に1度だけ取得）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextlib.contextmanager
+def atomic_write(path: str, mode: str = 'w', **kwargs) -> Iterator[IO]:
+    """
+    一時ファイルに書いてから置き換えるファイルを開く
+
+    ブロック内で例外が発生した場合は一時ファイルを削除し、元のファイルはそのまま残る。
+    既存のファイルを置き換える場合はその権限を引き継ぎ、新規の場合はumaskに従う。
+
+    Args:
+        path (str): 書き出し先のパス
+        mode (str): open()のモード（'w'・'wb'など）
+        **kwargs: open()に渡す引数（encoding・newlineなど）
+
+    Yields:
+        IO: 一時ファイルのファイルオブジェクト
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    suffix = os.path.splitext(path)[1]
+    fd, temp_path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+
+        # mkstempは0600で作成するため、置き換え先に合わせた権限にする
+        try:
+            file_mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            file_mode = 0o666 & ~_UMASK
+        os.chmod(temp_path, file_mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Medical Terms CSV Merger
+医療用語CSV統合・重複除去プログラム
+
+複数の用語CSV（japanese,reading,romaji,meaning形式）を統合し、
+正規化した用語で重複を除去します。各CSVを一定行数ずつ読み込んで
+ソート済みランとして一時ファイルに書き出し、k-way mergeで統合するため、
+入力の合計サイズに関わらずメモリ使用量はほぼ一定です。
+
+使用方法:
+    python3 merge_csv.py output.csv input1.csv input2.csv ...
+
+依存関係:
+    なし（標準ライブラリのみ）
+"""
+
+import argparse
+import csv
+import heapq
+import os
+import re
+import sys
+import tempfile
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from file_utils import atomic_write
+
+# CSVの列
+FIELDNAMES = ['japanese', 'reading', 'romaji', 'meaning']
+
+# ランファイルの1レコード: (正規化キー, 優先度, 通し番号, japanese, reading, romaji, meaning)
+Record = Tuple[str, int, int, str, str, str, str]
+
+
+class CSVMerger:
+    """複数の用語CSVをソート済みランのk-way mergeで統合するクラス"""
+
+    # 意味が食い違った場合の解決方法
+    STRATEGIES = {
+        'first': '先に指定したファイルを優先',
+        'last': '後に指定したファイルを優先',
+        'longest': '最も長い意味を優先',
+    }
+
+    def __init__(self, strategy: str = 'first', run_size: int = 50000,
+                 max_open_runs: int = 64, temp_dir: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            strategy (str): 意味が食い違った場合の解決方法（STRATEGIESのキー）
+            run_size (int): 1つのランに含める最大行数（メモリ使用量の上限）
+            max_open_runs (int): 同時に開くランファイルの最大数
+            temp_dir (str, optional): ランファイルを置く一時ディレクトリ
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"不明な優先方法です: {strategy}")
+        if run_size < 1 or max_open_runs < 2:
+            raise ValueError("run_sizeは1以上、max_open_runsは2以上を指定してください")
+
+        self.strategy = strategy
+        self.run_size = run_size
+        self.max_open_runs = max_open_runs
+        self.temp_dir = temp_dir
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        NFKC正規化（全角英数→半角、半角カナ→全角）と空白の整理
+
+        Args:
+            text (str): 正規化対象のテキスト
+
+        Returns:
+            str: 正規化されたテキスト
+        """
+        text = unicodedata.normalize('NFKC', text or '')
+        return re.sub(r'\s+', ' ', text).strip()
+
+    @staticmethod
+    def katakana_to_hiragana(text: str) -> str:
+        """
+        カタカナをひらがなに変換
+
+        Args:
+            text (str): 変換対象のテキスト
+
+        Returns:
+            str: ひらがなに変換されたテキスト
+        """
+        return ''.join(
+            chr(ord(char) - 0x60) if 'ァ' <= char <= 'ヶ' else char
+            for char in text
+        )
+
+    def normalize_row(self, row: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """
+        CSVの1行を正規化
+
+        Args:
+            row (Dict[str, str]): CSVの行
+
+        Returns:
+            Optional[Dict[str, str]]: 正規化された行（用語が空の場合はNone）
+        """
+        japanese = self.normalize_text(row.get('japanese'))
+        if not japanese:
+            return None
+
+        reading = self.normalize_text(row.get('reading')).replace(' ', '')
+        romaji = self.normalize_text(row.get('romaji')).replace(' ', '').lower()
+
+        return {
+            'japanese': japanese,
+            'reading': self.katakana_to_hiragana(reading),
+            'romaji': romaji,
+            'meaning': self.normalize_text(row.get('meaning')),
+        }
+
+    def read_records(self, csv_paths: List[str]) -> Iterator[Record]:
+        """
+        入力CSVを順に1行ずつ読み込んでレコードを生成
+
+        Args:
+            csv_paths (List[str]): 入力CSVファイルのパス（先頭ほど優先度が高い）
+
+        Yields:
+            Record: 正規化されたレコード
+        """
+        seq = 0
+        for priority, csv_path in enumerate(csv_paths):
+            # Excelで編集したファイルのBOMにも対応
+            with open(csv_path, 'r', encoding='utf-8-sig', newline='') as csvfile:
+                for row in csv.DictReader(csvfile):
+                    normalized = self.normalize_row(row)
+                    if normalized is None:
+                        continue
+                    seq += 1
+                    yield (
+                        normalized['japanese'], priority, seq,
+                        normalized['japanese'], normalized['reading'],
+                        normalized['romaji'], normalized['meaning'],
+                    )
+
+    def write_run(self, records: Iterable[Record], work_dir: str) -> str:
+        """
+        ソート済みレコードをランファイルに書き出す
+
+        Args:
+            records (Iterable[Record]): ソート済みレコード
+            work_dir (str): 作業ディレクトリ
+
+        Returns:
+            str: ランファイルのパス
+        """
+        fd, run_path = tempfile.mkstemp(suffix='.csv', dir=work_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as runfile:
+            csv.writer(runfile).writerows(records)
+        return run_path
+
+    @staticmethod
+    def read_run(run_path: str) -> Iterator[Record]:
+        """
+        ランファイルを1行ずつ読み込む
+
+        Args:
+            run_path (str): ランファイルのパス
+
+        Yields:
+            Record: レコード
+        """
+        with open(run_path, 'r', encoding='utf-8', newline='') as runfile:
+            for key, priority, seq, japanese, reading, romaji, meaning in csv.reader(runfile):
+                yield (key, int(priority), int(seq), japanese, reading, romaji, meaning)
+
+    def create_runs(self, csv_paths: List[str], work_dir: str) -> Tuple[List[str], int]:
+        """
+        入力CSVをrun_size行ずつソートしてランファイルを作成
+
+        Args:
+            csv_paths (List[str]): 入力CSVファイルのパス
+            work_dir (str): 作業ディレクトリ
+
+        Returns:
+            Tuple[List[str], int]: ランファイルのパスと読み込んだ行数
+        """
+        runs = []
+        buffer = []
+        total = 0
+
+        for record in self.read_records(csv_paths):
+            buffer.append(record)
+            total += 1
+            if len(buffer) >= self.run_size:
+                buffer.sort()
+                runs.append(self.write_run(buffer, work_dir))
+                buffer = []
+
+        if buffer:
+            buffer.sort()
+            runs.append(self.write_run(buffer, work_dir))
+
+        return runs, total
+
+    def merge_runs(self, runs: List[str], work_dir: str) -> Iterator[Record]:
+        """
+        ランファイルをk-way mergeする（多すぎる場合は段階的に統合）
+
+        Args:
+            runs (List[str]): ランファイルのパス
+            work_dir (str): 作業ディレクトリ
+
+        Yields:
+            Record: キー順に並んだレコード
+        """
+        # 同時に開くファイル数を抑えるため、max_open_runs個ずつ中間ランにまとめる
+        while len(runs) > self.max_open_runs:
+            merged_runs = []
+            for start in range(0, len(runs), self.max_open_runs):
+                group = runs[start:start + self.max_open_runs]
+                merged_runs.append(
+                    self.write_run(heapq.merge(*(self.read_run(path) for path in group)), work_dir)
+                )
+                for path in group:
+                    os.remove(path)
+            runs = merged_runs
+
+        yield from heapq.merge(*(self.read_run(path) for path in runs))
+
+    def resolve(self, group: List[Record]) -> Dict[str, str]:
+        """
+        同じ用語のレコード群から1行を決定
+
+        Args:
+            group (List[Record]): 優先度・通し番号順に並んだ同一キーのレコード
+
+        Returns:
+            Dict[str, str]: 統合後のCSV行
+        """
+        if self.strategy == 'last':
+            ordered = group[::-1]
+        elif self.strategy == 'longest':
+            ordered = sorted(group, key=lambda record: -len(record[6]))
+        else:
+            ordered = group
+
+        # 優先順に見て、空でない最初の値を採用
+        row = {}
+        for index, field in enumerate(FIELDNAMES, 3):
+            row[field] = next((record[index] for record in ordered if record[index]), '')
+        return row
+
+    def merge(self, csv_paths: List[str], output_path: str) -> Tuple[int, int]:
+        """
+        複数のCSVを統合して重複を除去し、出力ファイルに保存
+
+        Args:
+            csv_paths (List[str]): 入力CSVファイルのパス（先頭ほど優先度が高い）
+            output_path (str): 出力CSVファイルのパス
+
+        Returns:
+            Tuple[int, int]: 読み込んだ行数と出力した用語数
+        """
+        written = 0
+
+        with tempfile.TemporaryDirectory(dir=self.temp_dir) as work_dir:
+            print("ソート済みランを作成中...")
+            runs, total = self.create_runs(csv_paths, work_dir)
+            print(f"{total}行を{len(runs)}個のランに分割しました")
+
+            print("ランを統合中...")
+            with atomic_write(output_path, 'w', encoding='utf-8', newline='') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+                writer.writeheader()
+
+                group = []
+                for record in self.merge_runs(runs, work_dir):
+                    if group and record[0] != group[0][0]:
+                        writer.writerow(self.resolve(group))
+                        written += 1
+                        group = []
+                    group.append(record)
+                if group:
+                    writer.writerow(self.resolve(group))
+                    written += 1
+
+        print(f"CSVファイルを保存しました: {output_path}")
+        print(f"読み込んだ行数: {total} → 登録された用語数: {written}")
+
+        return total, written
+
+
+def main():
+    """メイン関数"""
+    strategies = "\n".join(f"  {key:8s} {desc}" for key, desc in CSVMerger.STRATEGIES.items())
+    parser = argparse.ArgumentParser(
+        description="複数の医療用語CSVを統合して重複を除去",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+使用例:
+  python3 merge_csv.py medical-terms.csv deck1.csv deck2.csv
+  python3 merge_csv.py merged.csv edits.csv extracted/*.csv --priority first
+
+意味の優先方法 (--priority):
+{strategies}
+
+用語はNFKC正規化（全角・半角の統一）した上で比較されます。
+        """
+    )
+
+    parser.add_argument(
+        'output_csv',
+        help='出力CSVファイルのパス'
+    )
+
+    parser.add_argument(
+        'input_csv',
+        nargs='+',
+        help='入力CSVファイルのパス（先に指定したものほど優先度が高い）'
+    )
+
+    parser.add_argument(
+        '--priority',
+        choices=list(CSVMerger.STRATEGIES),
+        default='first',
+        help='意味が食い違った場合の優先方法 (デフォルト: first)'
+    )
+
+    parser.add_argument(
+        '--run-size',
+        type=int,
+        default=50000,
+        help='1つのソート済みランに含める最大行数 (デフォルト: 50000)'
+    )
+
+    parser.add_argument(
+        '--temp-dir',
+        help='ソート済みランを置く一時ディレクトリ'
+    )
+
+    args = parser.parse_args()
+
+    # ファイル存在確認
+    for input_csv in args.input_csv:
+        if not Path(input_csv).exists():
+            print(f"入力ファイルが見つかりません: {input_csv}")
+            sys.exit(1)
+
+    try:
+        merger = CSVMerger(strategy=args.priority, run_size=args.run_size, temp_dir=args.temp_dir)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    merger.merge(args.input_csv, args.output_csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,13 @@ PDF to CSV Converter for Medical Terms
 
 import argparse
 import csv
+import json
 import re
 import sys
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Tuple
 
 try:
     import PyPDF2
@@ -38,18 +41,61 @@ except ImportError:
     print("   pip install pykakasi")
     sys.exit(1)
 
+# 打鍵難易度スコア（numpyがない場合は文字数順のソートのみ）
+try:
+    from difficulty_scorer import DifficultyScorer
+except ImportError:
+    DifficultyScorer = None
+
+from file_utils import atomic_write
+
+# 大量のPDFを集計する近似頻度モード（型注釈のみで使用）
+if TYPE_CHECKING:
+    from term_sketch import TermSketch
+
+
+def get_pykakasi_version() -> str:
+    """インストールされているpykakasiのバージョン（取得できない場合は空文字）"""
+    try:
+        from importlib.metadata import version
+        return version('pykakasi')
+    except Exception:
+        return getattr(pykakasi, '__version__', '')
+
+
+# 進捗コールバックの型: callback(stage, done, total)
+# stage は 'pages'（ページ抽出）, 'patterns'（用語抽出）, 'terms'（CSVデータ作成）のいずれか
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class ConversionCancelled(Exception):
+    """変換がキャンセルされたことを示す例外（進捗コールバックから送出する）"""
+
 
 class MedicalTermExtractor:
-    """医療用語抽出クラス"""
+    """
+    医療用語抽出クラス
+    
+    1つのインスタンスを複数スレッドから同時に使用できる。パターン・辞書は
+    compile_patterns()で変更不可の形に確定し、pykakasiの変換器はスレッドごとに作成する。
+    変換メモは全スレッドで共有する（dictの1回の読み書きはGILで不可分のためロック不要）。
+    """
+    
+    # スナップショットファイルの形式とバージョン（内容を変えたらバージョンを上げる）
+    SNAPSHOT_FORMAT = 'medical-term-extractor'
+    SNAPSHOT_VERSION = 1
+    
+    # 読み・ローマ字のメモに保持する最大件数
+    CACHE_LIMIT = 200000
     
     def __init__(self):
         """初期化"""
-        # pykakasiの設定（漢字→ひらがな変換用）
-        self.kks = pykakasi.kakasi()
-        self.kks.setMode('H', 'a')  # ひらがな→ローマ字
-        self.kks.setMode('K', 'a')  # カタカナ→ローマ字
-        self.kks.setMode('J', 'H')  # 漢字→ひらがな
-        self.conv = self.kks.getConverter()
+        # pykakasiの変換器（スレッドごとに、必要になった時点で作成）
+        self.local = threading.local()
+        
+        # 読み・ローマ字変換結果のメモ
+        self.reading_cache: Dict[str, str] = {}
+        self.romaji_cache: Dict[str, str] = {}
         
         # 医療用語のパターン（拡張可能）
         self.medical_patterns = [
@@ -117,43 +163,204 @@ class MedicalTermExtractor:
             '免疫療法': '免疫力を利用した治療法',
             '遺伝子治療': '遺伝子を使った治療法',
         }
+        
+        # 一般的な医療用語の文字パターン用の医療関連漢字
+        # （例：心、肺、肝、腎、脳、血、骨、筋、神経など医療関連漢字を含む語）
+        self.medical_chars = ['心', '肺', '肝', '腎', '脳', '血', '骨', '筋', '神', '医', '薬', '病', '症', '癌', '腫']
+        
+        self.compile_patterns()
+
+    def compile_patterns(self):
+        """
+        抽出パターン・辞書を変更不可の形に確定してコンパイル
+        
+        パターンや辞書を差し替えた後に呼び出す（複数スレッドで使用を始める前に行うこと）
+        """
+        self.medical_patterns = tuple(self.medical_patterns)
+        self.medical_chars = tuple(self.medical_chars)
+        self.medical_dictionary = MappingProxyType(dict(self.medical_dictionary))
+        self.compiled_patterns = tuple(re.compile(pattern) for pattern in self.medical_patterns)
+        self.compiled_char_patterns = tuple(
+            re.compile(f'[一-龯]*{re.escape(char)}[一-龯]*') for char in self.medical_chars
+        )
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
+    def warm_up(self):
+        """
+        pykakasiの辞書を事前に読み込む（ワーカー作成前の親プロセスなどで使用）
+        
+        辞書はプロセス内で共有されるため、他のスレッドでの変換器作成も速くなる
+        """
+        self.get_romaji_converter().do('あ')
+        self.get_reading_converter().do('亜')
+
+    def get_romaji_converter(self):
+        """
+        現在のスレッド用のローマ字変換器を取得（スレッドごとに初回のみ作成）
+        
+        Returns:
+            ローマ字変換用のpykakasi変換器
+        """
+        converter = getattr(self.local, 'romaji_converter', None)
+        if converter is None:
+            kks = pykakasi.kakasi()
+            kks.setMode('H', 'a')  # ひらがな→ローマ字
+            kks.setMode('K', 'a')  # カタカナ→ローマ字
+            kks.setMode('J', 'H')  # 漢字→ひらがな
+            converter = self.local.romaji_converter = kks.getConverter()
+        return converter
+
+    def get_reading_converter(self):
+        """
+        現在のスレッド用のひらがな読み変換器を取得（スレッドごとに初回のみ作成）
+        
+        Returns:
+            ひらがな読み変換用のpykakasi変換器
+        """
+        converter = getattr(self.local, 'reading_converter', None)
+        if converter is None:
+            kks = pykakasi.kakasi()
+            kks.setMode('J', 'H')  # 漢字→ひらがな
+            kks.setMode('K', 'H')  # カタカナ→ひらがな
+            converter = self.local.reading_converter = kks.getConverter()
+        return converter
+
+    def save_snapshot(self, snapshot_path: str):
+        """
+        抽出設定（パターン・辞書・変換メモ）をスナップショットファイルに保存
+        
+        Args:
+            snapshot_path (str): スナップショットファイルのパス
+        """
+        snapshot = {
+            'format': self.SNAPSHOT_FORMAT,
+            'version': self.SNAPSHOT_VERSION,
+            'pykakasi_version': get_pykakasi_version(),
+            'medical_patterns': list(self.medical_patterns),
+            'medical_chars': list(self.medical_chars),
+            'medical_dictionary': dict(self.medical_dictionary),
+            # 他スレッドが追加中でも安全なようにコピーしてから書き出す
+            'reading_cache': self.reading_cache.copy(),
+            'romaji_cache': self.romaji_cache.copy(),
+        }
+        
+        with atomic_write(snapshot_path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump(snapshot, snapshot_file, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_snapshot(cls, snapshot_path: str) -> 'MedicalTermExtractor':
+        """
+        スナップショットファイルから抽出器を作成
+        
+        pykakasiのバージョンが保存時と異なる場合は、変換メモだけを破棄する
+        
+        Args:
+            snapshot_path (str): スナップショットファイルのパス
+            
+        Returns:
+            MedicalTermExtractor: 抽出器
+            
+        Raises:
+            ValueError: スナップショットの形式またはバージョンが異なる場合
+        """
+        with open(snapshot_path, 'r', encoding='utf-8') as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        
+        if not isinstance(snapshot, dict) or snapshot.get('format') != cls.SNAPSHOT_FORMAT:
+            raise ValueError(f"スナップショットの形式が正しくありません: {snapshot_path}")
+        if snapshot.get('version') != cls.SNAPSHOT_VERSION:
+            raise ValueError(
+                f"スナップショットのバージョンが異なります: {snapshot.get('version')} "
+                f"(対応バージョン: {cls.SNAPSHOT_VERSION})"
+            )
+        
+        # __init__の辞書・パターン構築を省略して状態を復元
+        extractor = cls.__new__(cls)
+        extractor.local = threading.local()
+        extractor.medical_patterns = snapshot['medical_patterns']
+        extractor.medical_chars = snapshot['medical_chars']
+        extractor.medical_dictionary = snapshot['medical_dictionary']
+        
+        if snapshot.get('pykakasi_version') == get_pykakasi_version():
+            extractor.reading_cache = dict(snapshot['reading_cache'])
+            extractor.romaji_cache = dict(snapshot['romaji_cache'])
+        else:
+            extractor.reading_cache = {}
+            extractor.romaji_cache = {}
+        
+        extractor.compile_patterns()
+        return extractor
+
+    @classmethod
+    def load(cls, snapshot_path: Optional[str] = None) -> 'MedicalTermExtractor':
+        """
+        抽出器を作成（スナップショットがあれば読み込み、読み込めない場合は新規に作成）
+        
+        Args:
+            snapshot_path (str, optional): スナップショットファイルのパス
+            
+        Returns:
+            MedicalTermExtractor: 抽出器
+        """
+        if snapshot_path and Path(snapshot_path).exists():
+            try:
+                return cls.from_snapshot(snapshot_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"スナップショットを読み込めません（新規に作成します）: {e}")
+        return cls()
+
+    def extract_text_from_pdf(self, pdf_path: str,
+                              progress_callback: Optional[ProgressCallback] = None) -> str:
         """
         PDFファイルからテキストを抽出
         
         Args:
             pdf_path (str): PDFファイルのパス
+            progress_callback (ProgressCallback, optional): ページごとに呼ばれる進捗コールバック
             
         Returns:
             str: 抽出されたテキスト
+            
+        Raises:
+            ConversionCancelled: 進捗コールバックがキャンセルを要求した場合
         """
         try:
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
+                page_count = len(pdf_reader.pages)
+                page_texts = []
                 
                 print(f"PDFファイルを読み込み中: {pdf_path}")
-                print(f"ページ数: {len(pdf_reader.pages)}")
+                print(f"ページ数: {page_count}")
+                
+                if progress_callback:
+                    progress_callback('pages', 0, page_count)
                 
                 for page_num, page in enumerate(pdf_reader.pages, 1):
-                    page_text = page.extract_text()
-                    text += page_text + "\n"
-                    print(f"⏳ ページ {page_num}/{len(pdf_reader.pages)} 処理中...")
+                    page_texts.append(page.extract_text() + "\n")
+                    print(f"⏳ ページ {page_num}/{page_count} 処理中...")
+                    if progress_callback:
+                        progress_callback('pages', page_num, page_count)
                 
                 print("PDFテキスト抽出完了")
-                return text
+                return "".join(page_texts)
                 
+        except ConversionCancelled:
+            raise
         except Exception as e:
             print(f"❌ PDFファイルの読み込みエラー: {e}")
             return ""
 
-    def extract_medical_terms(self, text: str) -> List[str]:
+    def extract_medical_terms(self, text: str,
+                              progress_callback: Optional[ProgressCallback] = None,
+                              sketch: Optional['TermSketch'] = None) -> List[str]:
         """
         テキストから医療用語を抽出
         
         Args:
             text (str): 抽出対象のテキスト
+            progress_callback (ProgressCallback, optional): パターンごとに呼ばれる進捗コールバック
+            sketch (TermSketch, optional): 近似頻度モードで出現文書数を加算するスケッチ
+                （抽出した用語を1文書につき1回ずつ加算。上位はsketch.top()で取得）
             
         Returns:
             List[str]: 抽出された医療用語のリスト
@@ -165,27 +372,42 @@ class MedicalTermExtractor:
         
         print("医療用語を抽出中...")
         
+        # 進捗の総ステップ数（パターン + 辞書 + 医療関連漢字）
+        total_steps = len(self.compiled_patterns) + 1 + len(self.compiled_char_patterns)
+        step = 0
+        if progress_callback:
+            progress_callback('patterns', step, total_steps)
+        
         # パターンマッチングで医療用語を抽出
-        for pattern in self.medical_patterns:
-            matches = re.findall(pattern, text)
+        for pattern in self.compiled_patterns:
+            matches = pattern.findall(text)
             for match in matches:
                 if len(match) >= 2:  # 2文字以上の用語のみ
                     medical_terms.add(match)
+            step += 1
+            if progress_callback:
+                progress_callback('patterns', step, total_steps)
         
         # 辞書にある既知の医療用語を抽出
         for term in self.medical_dictionary.keys():
             if term in text:
                 medical_terms.add(term)
+        step += 1
+        if progress_callback:
+            progress_callback('patterns', step, total_steps)
         
         # 一般的な医療用語の文字パターンで追加抽出
-        # （例：心、肺、肝、腎、脳、血、骨、筋、神経など医療関連漢字を含む語）
-        medical_chars = ['心', '肺', '肝', '腎', '脳', '血', '骨', '筋', '神', '医', '薬', '病', '症', '癌', '腫']
-        for char in medical_chars:
-            pattern = f'[一-龯]*{char}[一-龯]*'
-            matches = re.findall(pattern, text)
+        for pattern in self.compiled_char_patterns:
+            matches = pattern.findall(text)
             for match in matches:
                 if 2 <= len(match) <= 10:  # 適切な長さの用語のみ
                     medical_terms.add(match)
+            step += 1
+            if progress_callback:
+                progress_callback('patterns', step, total_steps)
+        
+        if sketch is not None:
+            sketch.update(medical_terms)
         
         result = list(medical_terms)
         print(f"{len(result)}個の医療用語を抽出しました")
@@ -202,14 +424,21 @@ class MedicalTermExtractor:
         Returns:
             str: ローマ字変換結果
         """
+        romaji = self.romaji_cache.get(japanese_text)
+        if romaji is not None:
+            return romaji
+        
         try:
-            result = self.conv.do(japanese_text)
+            result = self.get_romaji_converter().do(japanese_text)
             # 特殊文字の置換
             romaji = result.replace(' ', '').replace('-', '').lower()
-            return romaji
         except Exception:
             # 変換に失敗した場合は元のテキストを返す
             return japanese_text.lower()
+        
+        if len(self.romaji_cache) < self.CACHE_LIMIT:
+            self.romaji_cache[japanese_text] = romaji
+        return romaji
 
     def get_reading(self, japanese_text: str) -> str:
         """
@@ -221,17 +450,18 @@ class MedicalTermExtractor:
         Returns:
             str: ひらがな読み
         """
+        reading = self.reading_cache.get(japanese_text)
+        if reading is not None:
+            return reading
+        
         try:
-            # 漢字→ひらがな変換用の設定
-            kks_reading = pykakasi.kakasi()
-            kks_reading.setMode('J', 'H')  # 漢字→ひらがな
-            kks_reading.setMode('K', 'H')  # カタカナ→ひらがな
-            conv_reading = kks_reading.getConverter()
-            
-            result = conv_reading.do(japanese_text)
-            return result.replace(' ', '')
+            reading = self.get_reading_converter().do(japanese_text).replace(' ', '')
         except Exception:
             return japanese_text
+        
+        if len(self.reading_cache) < self.CACHE_LIMIT:
+            self.reading_cache[japanese_text] = reading
+        return reading
 
     def get_meaning(self, term: str) -> str:
         """
@@ -262,21 +492,32 @@ class MedicalTermExtractor:
         else:
             return f"{term}に関する医療用語"
 
-    def create_csv_data(self, medical_terms: List[str]) -> List[Dict[str, str]]:
+    def create_csv_data(self, medical_terms: List[str],
+                        progress_callback: Optional[ProgressCallback] = None,
+                        batch_size: int = 20) -> List[Dict[str, str]]:
         """
         医療用語リストからCSVデータを作成
         
         Args:
             medical_terms (List[str]): 医療用語のリスト
+            progress_callback (ProgressCallback, optional): batch_size 件ごとに呼ばれる進捗コールバック
+            batch_size (int): 進捗を通知する用語数の単位
             
         Returns:
             List[Dict[str, str]]: CSVデータ
+            
+        Raises:
+            ConversionCancelled: 進捗コールバックがキャンセルを要求した場合
         """
         csv_data = []
+        total = len(medical_terms)
         
         print("CSVデータを作成中...")
         
-        for term in medical_terms:
+        if progress_callback:
+            progress_callback('terms', 0, total)
+        
+        for index, term in enumerate(medical_terms, 1):
             reading = self.get_reading(term)
             romaji = self.convert_to_romaji(reading)
             meaning = self.get_meaning(term)
@@ -289,12 +530,63 @@ class MedicalTermExtractor:
             })
             
             print(f"  ✓ {term} -> {reading} -> {romaji}")
+            
+            if progress_callback and (index % batch_size == 0 or index == total):
+                progress_callback('terms', index, total)
         
-        # ローマ字の長さでソート（短い順）
-        csv_data.sort(key=lambda x: len(x['romaji']))
+        # 難易度を付与して易しい順にソート
+        self.add_difficulty(csv_data)
+        self.sort_csv_data(csv_data)
         
         return csv_data
 
+    def add_difficulty(self, csv_data: List[Dict[str, str]]):
+        """
+        CSVデータに打鍵難易度（difficulty列）を付与
+        
+        numpyがインストールされていない場合は何もしない
+        
+        Args:
+            csv_data (List[Dict[str, str]]): CSVデータ（その場で更新）
+        """
+        if DifficultyScorer is None or not csv_data:
+            return
+        DifficultyScorer().add_difficulty(csv_data)
+
+    def sort_csv_data(self, csv_data: List[Dict[str, str]]):
+        """
+        CSVデータを易しい順にソート
+        
+        difficulty列があれば難易度順、なければローマ字の長さ順
+        
+        Args:
+            csv_data (List[Dict[str, str]]): CSVデータ（その場でソート）
+        """
+        if csv_data and 'difficulty' in csv_data[0]:
+            csv_data.sort(key=lambda x: (int(x['difficulty']), len(x['romaji'])))
+        else:
+            csv_data.sort(key=lambda x: len(x['romaji']))
+
+    def write_csv(self, csv_data: List[Dict[str, str]], output_path: str):
+        """
+        CSVファイルを書き出す（同じディレクトリの一時ファイルに書いてから置き換える）
+        
+        書き込み途中のファイルが読み込まれることはなく、失敗時は例外を送出する
+        
+        Args:
+            csv_data (List[Dict[str, str]]): CSVデータ
+            output_path (str): 出力ファイルパス
+        """
+        fieldnames = ['japanese', 'reading', 'romaji', 'meaning']
+        if csv_data and 'difficulty' in csv_data[0]:
+            fieldnames.append('difficulty')
+        
+        with atomic_write(output_path, 'w', encoding='utf-8', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            
+            writer.writeheader()
+            writer.writerows(csv_data)
+
     def save_to_csv(self, csv_data: List[Dict[str, str]], output_path: str):
         """
         CSVファイルに保存
@@ -304,12 +596,7 @@ class MedicalTermExtractor:
             output_path (str): 出力ファイルパス
         """
         try:
-            with open(output_path, 'w', encoding='utf-8', newline='') as csvfile:
-                fieldnames = ['japanese', 'reading', 'romaji', 'meaning']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                writer.writerows(csv_data)
+            self.write_csv(csv_data, output_path)
             
             print(f"CSVファイルを保存しました: {output_path}")
             print(f"登録された用語数: {len(csv_data)}")
@@ -357,11 +644,13 @@ def main():
         epilog="""
 使用例:
   python3 pdf_to_csv.py medical_textbook.pdf medical_terms.csv
+  python3 pdf_to_csv.py medical_textbook.pdf medical_terms.csv --snapshot extractor.json
   python3 pdf_to_csv.py --help
 
 CSVフォーマット:
-  japanese,reading,romaji,meaning
-  心電図,しんでんず,shindenzu,心臓の電気的活動を記録する検査
+  japanese,reading,romaji,meaning,difficulty
+  心電図,しんでんず,shindenzu,心臓の電気的活動を記録する検査,42
+  （difficulty列はnumpyがインストールされている場合のみ出力）
 
 必要な依存関係:
   pip install PyPDF2 pykakasi
@@ -380,6 +669,11 @@ CSVフォーマット:
         help='出力CSVファイルのパス (デフォルト: extracted_medical_terms.csv)'
     )
     
+    parser.add_argument(
+        '--snapshot',
+        help='抽出設定と変換メモのスナップショットファイル（あれば読み込み、変換後に更新）'
+    )
+    
     parser.add_argument(
         '--version',
         action='version',
@@ -398,9 +692,15 @@ CSVフォーマット:
         print("入力ファイルはPDFファイルである必要があります")
         sys.exit(1)
     
+    # 抽出器作成（スナップショットがあれば読み込み）
+    extractor = MedicalTermExtractor.load(args.snapshot)
+    
     # 変換実行
-    extractor = MedicalTermExtractor()
     extractor.process_pdf(args.input_pdf, args.output_csv)
+    
+    if args.snapshot:
+        extractor.save_snapshot(args.snapshot)
+        print(f"スナップショットを保存しました: {args.snapshot}")
 
 
 if __name__ == "__main__":
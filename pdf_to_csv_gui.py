@@ -19,21 +19,304 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
 import queue
+import time
 from pathlib import Path
 import sys
 import os
 
 # pdf_to_csv.pyからMedicalTermExtractorクラスをインポート
 try:
-    from pdf_to_csv import MedicalTermExtractor
+    from pdf_to_csv import MedicalTermExtractor, ConversionCancelled
 except ImportError:
     print("pdf_to_csv.pyが見つかりません。同じディレクトリに配置してください。")
     sys.exit(1)
 
 
+def format_duration(seconds):
+    """秒数を「1分10秒」形式の文字列に変換"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}秒"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}分{seconds}秒"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}時間{minutes}分"
+
+
+class ProgressReporter:
+    """MedicalTermExtractorの進捗コールバックを間引いてGUIキューへ送るクラス"""
+    
+    # 各ステージが進捗バー全体に占める範囲（開始%, 終了%）
+    STAGE_RANGES = {
+        'pages': (0, 50),
+        'patterns': (50, 60),
+        'terms': (60, 95),
+    }
+    STAGE_LABELS = {
+        'pages': 'ページ',
+        'patterns': 'パターン',
+        'terms': '用語',
+    }
+    
+    def __init__(self, out_queue, cancel_event, min_interval=0.1):
+        """
+        初期化
+        
+        Args:
+            out_queue (queue.Queue): GUIへのメッセージキュー
+            cancel_event (threading.Event): キャンセル要求イベント
+            min_interval (float): 進捗メッセージを送る最小間隔（秒）
+        """
+        self.queue = out_queue
+        self.cancel_event = cancel_event
+        self.min_interval = min_interval
+        self.stage = None
+        self.stage_start = 0.0
+        self.last_report = 0.0
+    
+    def __call__(self, stage, done, total):
+        """進捗コールバック本体（キャンセル要求時はConversionCancelledを送出）"""
+        if self.cancel_event.is_set():
+            raise ConversionCancelled()
+        
+        now = time.monotonic()
+        if stage != self.stage:
+            self.stage = stage
+            self.stage_start = now
+            self.last_report = 0.0
+        
+        # ステージの最初と最後以外は一定間隔で間引く
+        if 0 < done < total and now - self.last_report < self.min_interval:
+            return
+        self.last_report = now
+        
+        start, end = self.STAGE_RANGES.get(stage, (0, 100))
+        fraction = done / total if total else 1.0
+        self.queue.put(("progress", start + (end - start) * fraction))
+        
+        label = self.STAGE_LABELS.get(stage, stage)
+        status = f"{label} {done}/{total}"
+        elapsed = now - self.stage_start
+        if done > 0 and elapsed > 0:
+            rate = done / elapsed
+            status += f" | {rate:.1f} {label}/秒"
+            if done < total:
+                status += f" | 残り約 {format_duration((total - done) / rate)}"
+        self.queue.put(("status", status))
+
+
+class VirtualTermTable:
+    """表示行分のTreeview項目だけを使い回して大量の用語を表示する仮想スクロール表"""
+    
+    # (列キー, 見出し, 幅)
+    COLUMNS = (
+        ('japanese', '用語', 140),
+        ('reading', '読み', 160),
+        ('romaji', 'ローマ字', 160),
+        ('meaning', '意味', 260),
+    )
+    
+    # 検索入力から絞り込み実行までの待ち時間（ミリ秒）
+    SEARCH_DELAY = 200
+    
+    def __init__(self, parent, height=8):
+        """
+        初期化
+        
+        Args:
+            parent: 親ウィジェット
+            height (int): 表示行数（作成するTreeview項目数）
+        """
+        self.frame = ttk.Frame(parent)
+        self.height = height
+        self.entries = []   # (検索用小文字テキスト, 行データ) のリスト
+        self.rows = []      # 絞り込み・ソート後の表示対象
+        self.offset = 0
+        self.sort_key = None
+        self.sort_reverse = False
+        self.search_job = None
+        
+        # 検索バー
+        self.search_frame = ttk.Frame(self.frame)
+        self.search_label = ttk.Label(self.search_frame, text="🔍 検索:")
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(self.search_frame, textvariable=self.search_var, width=30)
+        self.count_var = tk.StringVar(value="0件")
+        self.count_label = ttk.Label(self.search_frame, textvariable=self.count_var)
+        self.search_var.trace_add('write', lambda *_: self.schedule_filter())
+        
+        # 表本体（スクロールはTreeviewではなく自前のオフセットで管理）
+        self.tree = ttk.Treeview(
+            self.frame,
+            columns=[key for key, _, _ in self.COLUMNS],
+            show='headings',
+            height=height,
+            selectmode='browse'
+        )
+        for key, title, width in self.COLUMNS:
+            self.tree.heading(key, text=title, command=lambda k=key: self.sort_by(k))
+            self.tree.column(key, width=width, anchor='w')
+        self.items = [self.tree.insert('', tk.END, values=()) for _ in range(height)]
+        
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scrollbar)
+        
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_to(self.offset - 3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_to(self.offset + 3))
+        
+        # Treeviewの項目は表示行数分しかないため、キー操作も表示範囲ごと移動する
+        self.tree.bind('<Up>', lambda e: self.move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self.move_selection(1))
+        self.tree.bind('<Prior>', lambda e: self.move_selection(-self.height))
+        self.tree.bind('<Next>', lambda e: self.move_selection(self.height))
+        
+        # レイアウト
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(1, weight=1)
+        self.search_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        self.search_frame.columnconfigure(1, weight=1)
+        self.search_label.grid(row=0, column=0, sticky="w")
+        self.search_entry.grid(row=0, column=1, sticky="ew", padx=(5, 10))
+        self.count_label.grid(row=0, column=2, sticky="e")
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        
+        self.render()
+
+    def grid(self, **kwargs):
+        """外枠フレームを配置"""
+        self.frame.grid(**kwargs)
+
+    def set_rows(self, rows):
+        """
+        表示データを設定
+        
+        Args:
+            rows (List[Dict[str, str]]): CSVデータ
+        """
+        keys = [key for key, _, _ in self.COLUMNS]
+        self.entries = [
+            ("\t".join(row.get(key, '') for key in keys).lower(), row)
+            for row in rows
+        ]
+        self.sort_key = None
+        self.sort_reverse = False
+        self.update_headings()
+        self.apply_filter()
+
+    def schedule_filter(self):
+        """入力が落ち着いてから絞り込みを実行"""
+        if self.search_job is not None:
+            self.frame.after_cancel(self.search_job)
+        self.search_job = self.frame.after(self.SEARCH_DELAY, self.apply_filter)
+
+    def apply_filter(self):
+        """検索語で絞り込み（ソート順は維持）"""
+        self.search_job = None
+        query = self.search_var.get().strip().lower()
+        if query:
+            self.rows = [row for text, row in self.entries if query in text]
+        else:
+            self.rows = [row for _, row in self.entries]
+        self.count_var.set(f"{len(self.rows)}件 / 全{len(self.entries)}件")
+        self.offset = 0
+        self.render()
+
+    def sort_by(self, key):
+        """列見出しクリックでソート（同じ列は昇順・降順を切り替え）"""
+        if self.sort_key == key:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_key = key
+            self.sort_reverse = False
+        self.entries.sort(key=lambda entry: entry[1].get(key, ''), reverse=self.sort_reverse)
+        self.update_headings()
+        self.apply_filter()
+
+    def update_headings(self):
+        """ソート状態を見出しに反映"""
+        for key, title, _ in self.COLUMNS:
+            if key == self.sort_key:
+                title += " ▼" if self.sort_reverse else " ▲"
+            self.tree.heading(key, text=title)
+
+    def scroll_to(self, offset):
+        """先頭行のオフセットを変更して再描画"""
+        max_offset = max(len(self.rows) - self.height, 0)
+        offset = min(max(int(offset), 0), max_offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def on_scrollbar(self, action, value, unit=None):
+        """スクロールバー操作"""
+        if action == 'moveto':
+            self.scroll_to(float(value) * len(self.rows))
+        elif action == 'scroll':
+            step = self.height if unit == 'pages' else 1
+            self.scroll_to(self.offset + int(value) * step)
+
+    def on_mousewheel(self, event):
+        """マウスホイール操作（macOSのdeltaは120単位ではなく小さな値）"""
+        if abs(event.delta) < 120:
+            steps = (event.delta > 0) - (event.delta < 0)
+        else:
+            steps = int(event.delta / 120)
+        self.scroll_to(self.offset - steps * 3)
+        return "break"
+
+    def move_selection(self, step):
+        """
+        選択行をキー操作で移動（表示範囲の外に出る場合はスクロール）
+        
+        Args:
+            step (int): 移動する行数（負の値で上へ）
+        """
+        if not self.rows:
+            return "break"
+        
+        selection = self.tree.selection()
+        index = self.items.index(selection[0]) if selection else 0
+        target = min(max(self.offset + index + step, 0), len(self.rows) - 1)
+        
+        if target < self.offset:
+            self.scroll_to(target)
+        elif target >= self.offset + self.height:
+            self.scroll_to(target - self.height + 1)
+        
+        item = self.items[target - self.offset]
+        self.tree.selection_set(item)
+        self.tree.focus(item)
+        return "break"
+
+    def render(self):
+        """表示範囲の行だけをTreeview項目に書き込む"""
+        visible = self.rows[self.offset:self.offset + self.height]
+        for index, item in enumerate(self.items):
+            if index < len(visible):
+                row = visible[index]
+                self.tree.item(item, values=[row.get(key, '') for key, _, _ in self.COLUMNS])
+            else:
+                self.tree.item(item, values=())
+        
+        if self.rows:
+            first = self.offset / len(self.rows)
+            last = min((self.offset + self.height) / len(self.rows), 1.0)
+        else:
+            first, last = 0.0, 1.0
+        self.scrollbar.set(first, last)
+
+
 class PDFConverterGUI:
     """PDF to CSV変換GUIアプリケーション"""
     
+    # ログ表示に保持する最大行数
+    LOG_MAX_LINES = 5000
+    
+    # check_queueの1回の呼び出しで処理する最大メッセージ数
+    QUEUE_BATCH_SIZE = 1000
+    
     def __init__(self, root):
         """初期化"""
         self.root = root
@@ -50,9 +333,12 @@ class PDFConverterGUI:
         # キューとスレッド管理
         self.queue = queue.Queue()
         self.processing = False
+        self.cancel_event = threading.Event()
+        self.log_buffer = []
         
         # 医療用語抽出器
         self.extractor = None
+        self.extractor_lock = threading.Lock()
         
         # UI作成
         self.create_widgets()
@@ -60,6 +346,18 @@ class PDFConverterGUI:
         
         # キューチェック開始
         self.check_queue()
+        
+        # 抽出器をバックグラウンドで準備（初回変換までの待ち時間を減らす）
+        threading.Thread(target=self.get_extractor, daemon=True).start()
+
+    def get_extractor(self):
+        """医療用語抽出器を取得（初回のみ作成して辞書を事前読み込み）"""
+        with self.extractor_lock:
+            if self.extractor is None:
+                extractor = MedicalTermExtractor()
+                extractor.warm_up()
+                self.extractor = extractor
+            return self.extractor
 
     def create_widgets(self):
         """ウィジェット作成"""
@@ -107,7 +405,7 @@ class PDFConverterGUI:
         
         # ソート
         self.sort_var = tk.BooleanVar(value=True)
-        self.sort_check = ttk.Checkbutton(self.options_frame, text="文字数順にソート", variable=self.sort_var)
+        self.sort_check = ttk.Checkbutton(self.options_frame, text="難易度順にソート", variable=self.sort_var)
         
         # 実行ボタンフレーム
         self.button_frame = ttk.Frame(self.main_frame)
@@ -117,16 +415,25 @@ class PDFConverterGUI:
             command=self.start_conversion,
             style="Accent.TButton"
         )
+        self.cancel_button = ttk.Button(
+            self.button_frame,
+            text="⏹ キャンセル",
+            command=self.cancel_conversion,
+            state=tk.DISABLED
+        )
         self.clear_button = ttk.Button(self.button_frame, text="🗑️ クリア", command=self.clear_all)
         
         # プログレスバー
+        self.progress_frame = ttk.Frame(self.main_frame)
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(
-            self.main_frame,
+            self.progress_frame,
             variable=self.progress_var,
             maximum=100,
             mode='determinate'
         )
+        self.status_var = tk.StringVar(value="待機中")
+        self.status_label = ttk.Label(self.progress_frame, textvariable=self.status_var)
         
         # ログフレーム
         self.log_frame = ttk.LabelFrame(self.main_frame, text="📋 変換ログ", padding="10")
@@ -140,13 +447,9 @@ class PDFConverterGUI:
         
         # 結果フレーム
         self.result_frame = ttk.LabelFrame(self.main_frame, text="📊 変換結果", padding="10")
-        self.result_text = scrolledtext.ScrolledText(
-            self.result_frame,
-            height=8,
-            width=70,
-            wrap=tk.WORD,
-            state=tk.DISABLED
-        )
+        self.summary_var = tk.StringVar()
+        self.summary_label = ttk.Label(self.result_frame, textvariable=self.summary_var)
+        self.result_table = VirtualTermTable(self.result_frame, height=8)
 
     def setup_layout(self):
         """レイアウト設定"""
@@ -189,10 +492,14 @@ class PDFConverterGUI:
         # ボタンフレーム
         self.button_frame.grid(row=3, column=0, pady=(0, 10))
         self.convert_button.grid(row=0, column=0, padx=(0, 10))
-        self.clear_button.grid(row=0, column=1)
+        self.cancel_button.grid(row=0, column=1, padx=(0, 10))
+        self.clear_button.grid(row=0, column=2)
         
         # プログレスバー
-        self.progress_bar.grid(row=4, column=0, sticky="ew", pady=(0, 10))
+        self.progress_frame.grid(row=4, column=0, sticky="ew", pady=(0, 10))
+        self.progress_frame.columnconfigure(0, weight=1)
+        self.progress_bar.grid(row=0, column=0, sticky="ew")
+        self.status_label.grid(row=1, column=0, sticky="w", pady=(5, 0))
         
         # ログフレーム
         self.log_frame.grid(row=5, column=0, sticky="ew", pady=(0, 10))
@@ -202,7 +509,9 @@ class PDFConverterGUI:
         # 結果フレーム
         self.result_frame.grid(row=6, column=0, sticky="ew")
         self.result_frame.columnconfigure(0, weight=1)
-        self.result_text.grid(row=0, column=0, sticky="nsew")
+        self.result_frame.rowconfigure(1, weight=1)
+        self.summary_label.grid(row=0, column=0, sticky="w", pady=(0, 5))
+        self.result_table.grid(row=1, column=0, sticky="nsew")
         
         # 行の重み設定
         self.main_frame.rowconfigure(5, weight=1)
@@ -232,33 +541,48 @@ class PDFConverterGUI:
             self.output_var.set(filename)
 
     def log_message(self, message):
-        """ログメッセージ表示"""
+        """ログメッセージをバッファに追加（表示はflush_logでまとめて行う）"""
+        self.log_buffer.append(message)
+
+    def flush_log(self):
+        """バッファのログメッセージを一括で表示し、古い行を削除"""
+        if not self.log_buffer:
+            return
+        
+        # 表示上限を超える分は挿入前に捨てる
+        lines = self.log_buffer[-self.LOG_MAX_LINES:]
+        self.log_buffer = []
+        
         self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, message + "\n")
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        
+        line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        excess = line_count - self.LOG_MAX_LINES
+        if excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
+        
         self.log_text.see(tk.END)
         self.log_text.config(state=tk.DISABLED)
-        self.root.update_idletasks()
 
-    def show_result(self, result_text):
+    def show_result(self, summary, csv_data):
         """結果表示"""
-        self.result_text.config(state=tk.NORMAL)
-        self.result_text.delete(1.0, tk.END)
-        self.result_text.insert(tk.END, result_text)
-        self.result_text.config(state=tk.DISABLED)
+        self.summary_var.set(summary)
+        self.result_table.set_rows(csv_data)
 
     def clear_all(self):
         """全てをクリア"""
         self.input_var.set("")
         self.output_var.set("")
         self.progress_var.set(0)
+        self.status_var.set("待機中")
         
+        self.log_buffer = []
         self.log_text.config(state=tk.NORMAL)
         self.log_text.delete(1.0, tk.END)
         self.log_text.config(state=tk.DISABLED)
         
-        self.result_text.config(state=tk.NORMAL)
-        self.result_text.delete(1.0, tk.END)
-        self.result_text.config(state=tk.DISABLED)
+        self.summary_var.set("")
+        self.result_table.set_rows([])
 
     def validate_inputs(self):
         """入力値検証"""
@@ -295,39 +619,46 @@ class PDFConverterGUI:
             return
         
         self.processing = True
+        self.cancel_event = threading.Event()
         self.convert_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
         self.progress_var.set(0)
+        self.status_var.set("変換準備中...")
         
         # バックグラウンドで変換実行
         thread = threading.Thread(target=self.convert_pdf_worker)
         thread.daemon = True
         thread.start()
 
+    def cancel_conversion(self):
+        """変換キャンセル要求"""
+        if self.processing:
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_var.set("キャンセル中...")
+
     def convert_pdf_worker(self):
         """変換ワーカー（別スレッド）"""
+        reporter = ProgressReporter(self.queue, self.cancel_event)
+        started = time.monotonic()
         try:
-            # プログレス更新
-            self.queue.put(("progress", 10))
             self.queue.put(("log", "変換準備中..."))
             
             # 医療用語抽出器初期化
-            if not self.extractor:
-                self.extractor = MedicalTermExtractor()
+            extractor = self.get_extractor()
             
-            self.queue.put(("progress", 20))
             self.queue.put(("log", "PDFファイルを読み込み中..."))
             
             # PDFからテキスト抽出
-            text = self.extractor.extract_text_from_pdf(self.input_var.get())
+            text = extractor.extract_text_from_pdf(self.input_var.get(), reporter)
             if not text:
                 self.queue.put(("error", "PDFからテキストを抽出できませんでした"))
                 return
             
-            self.queue.put(("progress", 50))
             self.queue.put(("log", "医療用語を抽出中..."))
             
             # 医療用語抽出
-            medical_terms = self.extractor.extract_medical_terms(text)
+            medical_terms = extractor.extract_medical_terms(text, reporter)
             if not medical_terms:
                 self.queue.put(("error", "医療用語が見つかりませんでした"))
                 return
@@ -346,42 +677,42 @@ class PDFConverterGUI:
             if self.unique_var.get():
                 filtered_terms = list(set(filtered_terms))
             
-            self.queue.put(("progress", 70))
             self.queue.put(("log", f"{len(filtered_terms)}個の医療用語を抽出"))
             self.queue.put(("log", "CSVデータを作成中..."))
             
             # CSVデータ作成
-            csv_data = self.extractor.create_csv_data(filtered_terms)
+            csv_data = extractor.create_csv_data(filtered_terms, reporter)
             
             # ソート
             if self.sort_var.get():
-                csv_data.sort(key=lambda x: len(x['romaji']))
+                extractor.sort_csv_data(csv_data)
+            
+            # 保存前の最終キャンセル確認
+            if self.cancel_event.is_set():
+                raise ConversionCancelled()
             
-            self.queue.put(("progress", 90))
+            self.queue.put(("progress", 95))
             self.queue.put(("log", "CSVファイルを保存中..."))
             
             # CSVファイル保存
-            self.extractor.save_to_csv(csv_data, self.output_var.get())
+            extractor.save_to_csv(csv_data, self.output_var.get())
             
             self.queue.put(("progress", 100))
+            self.queue.put(("status", f"完了 ({format_duration(time.monotonic() - started)})"))
             self.queue.put(("log", "変換完了!"))
             
             # 結果表示用データ作成
-            result_text = f"変換結果サマリー\n"
-            result_text += f"=" * 30 + "\n"
-            result_text += f"入力ファイル: {Path(self.input_var.get()).name}\n"
-            result_text += f"出力ファイル: {Path(self.output_var.get()).name}\n"
-            result_text += f"抽出された用語数: {len(csv_data)}\n\n"
-            result_text += f"抽出された医療用語（最初の10個）:\n"
-            for i, data in enumerate(csv_data[:10]):
-                result_text += f"{i+1:2d}. {data['japanese']} ({data['reading']}) -> {data['romaji']}\n"
-            
-            if len(csv_data) > 10:
-                result_text += f"... 他 {len(csv_data) - 10} 個\n"
+            summary = (
+                f"入力ファイル: {Path(self.input_var.get()).name} | "
+                f"出力ファイル: {Path(self.output_var.get()).name} | "
+                f"抽出された用語数: {len(csv_data)}"
+            )
             
-            self.queue.put(("result", result_text))
+            self.queue.put(("result", (summary, csv_data)))
             self.queue.put(("success", "変換が正常に完了しました"))
             
+        except ConversionCancelled:
+            self.queue.put(("cancelled", "変換をキャンセルしました"))
         except Exception as e:
             self.queue.put(("error", f"変換エラー: {str(e)}"))
         finally:
@@ -389,30 +720,50 @@ class PDFConverterGUI:
 
     def check_queue(self):
         """キューをチェックしてUIを更新"""
+        handled = 0
         try:
-            while True:
+            while handled < self.QUEUE_BATCH_SIZE:
                 msg_type, data = self.queue.get_nowait()
+                handled += 1
                 
                 if msg_type == "progress":
                     self.progress_var.set(data)
+                elif msg_type == "status":
+                    self.status_var.set(data)
                 elif msg_type == "log":
                     self.log_message(data)
                 elif msg_type == "result":
-                    self.show_result(data)
+                    self.show_result(*data)
                 elif msg_type == "error":
                     self.log_message(f"エラー: {data}")
+                    self.flush_log()
                     messagebox.showerror("エラー", data)
                 elif msg_type == "success":
+                    self.flush_log()
                     messagebox.showinfo("完了", data)
+                elif msg_type == "cancelled":
+                    self.log_message(data)
+                    self.progress_var.set(0)
+                    self.status_var.set(data)
                 elif msg_type == "finish":
                     self.processing = False
                     self.convert_button.config(state=tk.NORMAL)
+                    self.cancel_button.config(state=tk.DISABLED)
                     
         except queue.Empty:
             pass
         
-        # 定期的にチェック
-        self.root.after(100, self.check_queue)
+        # ログはまとめて1回で挿入
+        self.flush_log()
+        
+        # 定期的にチェック（未処理が残っていれば即座に、変換中は短い間隔、待機中は長い間隔）
+        if handled >= self.QUEUE_BATCH_SIZE:
+            interval = 1
+        elif self.processing:
+            interval = 50
+        else:
+            interval = 250
+        self.root.after(interval, self.check_queue)
 
 
 def main():
@@ -438,6 +789,7 @@ def main():
     def on_closing():
         if app.processing:
             if messagebox.askokcancel("終了確認", "変換処理中です。終了しますか？"):
+                app.cancel_event.set()
                 root.destroy()
         else:
             root.destroy()
@@ -9,6 +9,7 @@ class DifficultyManager {
                 timeLimit: 120,
                 termCount: 8,
                 showHints: true,
+                difficultyRange: [0, 40],
                 name: '初級',
                 description: 'ゆっくり練習したい方向け'
             },
@@ -16,6 +17,7 @@ class DifficultyManager {
                 timeLimit: 60,
                 termCount: 10,
                 showHints: true,
+                difficultyRange: [0, 100],
                 name: '中級',
                 description: '標準的な練習'
             },
@@ -23,6 +25,7 @@ class DifficultyManager {
                 timeLimit: 45,
                 termCount: 12,
                 showHints: false,
+                difficultyRange: [40, 100],
                 name: '上級',
                 description: '集中力が必要'
             },
@@ -30,6 +33,7 @@ class DifficultyManager {
                 timeLimit: 30,
                 termCount: 15,
                 showHints: false,
+                difficultyRange: [65, 100],
                 name: 'エキスパート',
                 description: '最高難易度'
             }
@@ -95,21 +99,77 @@ class DifficultyManager {
         // 難易度に応じて用語を選択
         let filteredTerms = [...terms];
         
-        if (settings.name === '初級') {
-            // 簡単な用語（短い用語を優先）
-            filteredTerms = terms.filter(term => 
-                term.romaji && term.romaji.length <= 8
-            ).sort((a, b) => a.romaji.length - b.romaji.length);
-        } else if (settings.name === '上級' || settings.name === 'エキスパート') {
-            // 難しい用語（長い用語を優先）
-            filteredTerms = terms.filter(term => 
-                term.romaji && term.romaji.length >= 6
-            ).sort((a, b) => b.romaji.length - a.romaji.length);
+        if (settings.difficultyRange && this.hasDifficultyScores(terms)) {
+            // difficulty列（0〜100）がある場合はその範囲で選択
+            const [min, max] = settings.difficultyRange;
+            filteredTerms = terms.filter(term => {
+                const difficulty = Number(term.difficulty);
+                return difficulty >= min && difficulty <= max;
+            });
+            if (this.hasWeights(filteredTerms)) {
+                // weight列がある場合は苦手な用語ほど選ばれやすくする
+                filteredTerms = this.weightedShuffle(filteredTerms);
+            } else if (settings.name === '初級') {
+                filteredTerms.sort((a, b) => Number(a.difficulty) - Number(b.difficulty));
+            } else if (settings.name === '上級' || settings.name === 'エキスパート') {
+                filteredTerms.sort((a, b) => Number(b.difficulty) - Number(a.difficulty));
+            }
+        } else {
+            if (settings.name === '初級') {
+                // 簡単な用語（短い用語を優先）
+                filteredTerms = terms.filter(term => 
+                    term.romaji && term.romaji.length <= 8
+                ).sort((a, b) => a.romaji.length - b.romaji.length);
+            } else if (settings.name === '上級' || settings.name === 'エキスパート') {
+                // 難しい用語（長い用語を優先）
+                filteredTerms = terms.filter(term => 
+                    term.romaji && term.romaji.length >= 6
+                ).sort((a, b) => b.romaji.length - a.romaji.length);
+            }
+            if (this.hasWeights(filteredTerms)) {
+                // weight列がある場合は苦手な用語ほど選ばれやすくする
+                filteredTerms = this.weightedShuffle(filteredTerms);
+            }
         }
         
         // 指定された問題数に制限
         return filteredTerms.slice(0, Math.min(settings.termCount, filteredTerms.length));
     }
+
+    /**
+     * 用語データにdifficulty列（difficulty_scorer.pyで付与）があるかチェック
+     * @param {Array} terms - 全用語配列
+     * @returns {boolean} 全用語に数値の難易度があるかどうか
+     */
+    hasDifficultyScores(terms) {
+        return terms.length > 0 && terms.every(term =>
+            term.difficulty !== undefined && term.difficulty !== '' && !isNaN(Number(term.difficulty))
+        );
+    }
+
+    /**
+     * 用語データにweight列（session_aggregator.pyで付与）があるかチェック
+     * @param {Array} terms - 用語配列
+     * @returns {boolean} 全用語に正の重みがあるかどうか
+     */
+    hasWeights(terms) {
+        return terms.length > 0 && terms.every(term =>
+            term.weight !== undefined && term.weight !== '' && Number(term.weight) > 0
+        );
+    }
+
+    /**
+     * 重み付きシャッフル（重みが大きい用語ほど先頭に来やすい）
+     * @param {Array} terms - weight列を持つ用語配列
+     * @returns {Array} 並べ替えた用語配列
+     */
+    weightedShuffle(terms) {
+        // Efraimidis-Spirakis法: random^(1/weight) の降順に並べる
+        return terms
+            .map(term => ({ term, key: Math.pow(Math.random(), 1 / Number(term.weight)) }))
+            .sort((a, b) => b.key - a.key)
+            .map(item => item.term);
+    }
 }
 
 /**
@@ -463,6 +523,106 @@ class CSVManager {
     }
 }
 
+/**
+ * セッション記録クラス
+ * 用語ごとの打鍵数・ミス数・所要時間を記録し、NDJSON形式で書き出す
+ * （session_aggregator.py で集計して出題の重み付けに使用）
+ */
+class SessionRecorder {
+    constructor() {
+        this.sessionId = this.createSessionId();
+        this.records = [];
+        this.current = null;
+    }
+
+    /**
+     * セッションIDを生成
+     * @returns {string} セッションID
+     */
+    createSessionId() {
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
+    }
+
+    /**
+     * 新しいセッションを開始（記録をリセット）
+     */
+    startSession() {
+        this.sessionId = this.createSessionId();
+        this.records = [];
+        this.current = null;
+    }
+
+    /**
+     * 用語の記録を開始
+     * @param {Object} term - 出題中の用語
+     */
+    startTerm(term) {
+        this.finishTerm(false);
+        this.current = {
+            session: this.sessionId,
+            term: term.japanese,
+            reading: term.reading,
+            keystrokes: 0,
+            errors: 0,
+            startedAt: Date.now()
+        };
+    }
+
+    /**
+     * 打鍵を記録
+     * @param {boolean} isError - 入力が正解パターンから外れたかどうか
+     */
+    recordKeystroke(isError) {
+        if (!this.current) return;
+        this.current.keystrokes++;
+        if (isError) {
+            this.current.errors++;
+        }
+    }
+
+    /**
+     * 用語の記録を終了
+     * @param {boolean} completed - 正解したかどうか
+     */
+    finishTerm(completed) {
+        if (!this.current) return;
+        const { startedAt, ...record } = this.current;
+        if (record.keystrokes > 0) {
+            this.records.push({
+                ...record,
+                duration_ms: Date.now() - startedAt,
+                completed: completed,
+                started_at: new Date(startedAt).toISOString()
+            });
+        }
+        this.current = null;
+    }
+
+    /**
+     * 記録があるかチェック
+     * @returns {boolean} 記録があるかどうか
+     */
+    hasRecords() {
+        return this.records.length > 0;
+    }
+
+    /**
+     * 記録をNDJSONファイルとしてダウンロード
+     */
+    download() {
+        const ndjson = this.records.map(record => JSON.stringify(record)).join('\n') + '\n';
+        const blob = new Blob([ndjson], { type: 'application/x-ndjson' });
+        const url = URL.createObjectURL(blob);
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = `session-${this.sessionId}.ndjson`;
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+        URL.revokeObjectURL(url);
+    }
+}
+
 // デフォルトの医療用語データ（CSVが読み込めない場合のフォールバック）
 const defaultMedicalTerms = [
     {
@@ -518,6 +678,7 @@ class TypingGame {
         this.csvManager = new CSVManager();
         this.romajiPatterns = new RomajiPatterns(); // ローマ字パターン管理
         this.difficultyManager = new DifficultyManager(); // 難易度管理
+        this.sessionRecorder = new SessionRecorder(); // セッション記録
         this.medicalTerms = [];
         this.shuffledTerms = [];
         
@@ -535,6 +696,7 @@ class TypingGame {
             startBtn: document.getElementById('startBtn'),
             nextBtn: document.getElementById('nextBtn'),
             restartBtn: document.getElementById('restartBtn'),
+            exportLogBtn: document.getElementById('exportLogBtn'),
             inputField: document.getElementById('inputField'),
             targetText: document.getElementById('targetText'),
             termJapanese: document.getElementById('termJapanese'),
@@ -567,6 +729,9 @@ class TypingGame {
         this.elements.startBtn.addEventListener('click', () => this.startGame());
         this.elements.nextBtn.addEventListener('click', () => this.nextTerm());
         this.elements.restartBtn.addEventListener('click', () => this.restartGame());
+        if (this.elements.exportLogBtn) {
+            this.elements.exportLogBtn.addEventListener('click', () => this.sessionRecorder.download());
+        }
         this.elements.inputField.addEventListener('input', (e) => this.handleInput(e));
         this.elements.inputField.addEventListener('keydown', (e) => this.handleKeyDown(e));
         
@@ -766,6 +931,8 @@ class TypingGame {
         this.elements.gameOver.style.display = 'none';
         
         this.displayCurrentTerm();
+        this.sessionRecorder.startSession();
+        this.sessionRecorder.startTerm(this.shuffledTerms[this.currentTermIndex]);
         this.startTimer();
         this.updateStats();
         
@@ -792,6 +959,11 @@ class TypingGame {
     endGame() {
         this.isGameActive = false;
         clearInterval(this.timerInterval);
+        this.sessionRecorder.finishTerm(false);
+        
+        if (this.elements.exportLogBtn) {
+            this.elements.exportLogBtn.style.display = this.sessionRecorder.hasRecords() ? 'inline-block' : 'none';
+        }
         
         this.elements.inputField.disabled = true;
         this.elements.gameOver.style.display = 'block';
@@ -842,6 +1014,9 @@ class TypingGame {
         this.elements.nextBtn.style.display = 'none';
         this.elements.restartBtn.style.display = 'none';
         this.elements.gameOver.style.display = 'none';
+        if (this.elements.exportLogBtn) {
+            this.elements.exportLogBtn.style.display = 'none';
+        }
         this.elements.questionArea.style.display = 'block';
         this.elements.typingArea.style.display = 'block';
         this.elements.timer.textContent = this.timeLimit;
@@ -864,13 +1039,20 @@ class TypingGame {
         
         // JavaScript側で複数のローマ字パターンをチェック
         if (this.romajiPatterns.isValidInput(this.currentInput, currentTerm.reading)) {
-            // 完全一致 - 正解
+            // 完全一致 - 正解（最後の打鍵も記録してから用語の記録を終了）
+            this.sessionRecorder.recordKeystroke(false);
             this.completeTerm();
             return;
         }
         
         // 部分入力チェック
-        if (this.romajiPatterns.isPartiallyCorrect(this.currentInput, currentTerm.reading)) {
+        const isPartiallyCorrect = this.romajiPatterns.isPartiallyCorrect(this.currentInput, currentTerm.reading);
+        
+        // 削除以外の入力で正解パターンから外れた場合をミスとして記録
+        const isDeletion = e.inputType && e.inputType.startsWith('delete');
+        this.sessionRecorder.recordKeystroke(!isPartiallyCorrect && !isDeletion);
+        
+        if (isPartiallyCorrect) {
             // 正しい方向に進んでいる - 緑色表示
             e.target.style.backgroundColor = '#e8f5e8';
             e.target.style.borderColor = '#28a745';
@@ -911,6 +1093,7 @@ class TypingGame {
         this.score += termLength * 10;
         this.correctTyped += termLength;
         this.termsCompleted++;
+        this.sessionRecorder.finishTerm(true);
         
         // 次の問題に進む
         setTimeout(() => {
@@ -938,6 +1121,7 @@ class TypingGame {
         this.updateStats();
         
         if (this.isGameActive) {
+            this.sessionRecorder.startTerm(this.shuffledTerms[this.currentTermIndex]);
             this.elements.inputField.focus();
         }
     }
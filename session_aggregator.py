@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Typing Session Log Aggregator
+タイピングセッションログ集計プログラム
+
+タイピング練習アプリが書き出したセッションログ（NDJSON形式）を1行ずつ読み込み、
+用語ごとのミス率と1打鍵あたりの所要時間を集計します。集計結果から用語CSVに
+weight列を追加し、アプリが苦手な用語を優先して出題できるようにします。
+集計はデッキに含まれる用語ごとの固定サイズの統計だけを保持するため、
+ログの量に関わらずメモリ使用量は一定です。
+
+使用方法:
+    python3 session_aggregator.py deck.csv weighted.csv logs/*.ndjson
+
+依存関係:
+    なし（標準ライブラリのみ）
+"""
+
+import argparse
+import csv
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, TextIO, Tuple
+
+from file_utils import atomic_write
+from merge_csv import CSVMerger
+
+
+class TermStats:
+    """1用語分の集計値（Welford法で1打鍵あたり時間の平均・分散を逐次計算）"""
+
+    __slots__ = ('attempts', 'completed', 'keystrokes', 'errors',
+                 'duration_ms', 'latency_mean', 'latency_m2')
+
+    def __init__(self):
+        """初期化"""
+        self.attempts = 0
+        self.completed = 0
+        self.keystrokes = 0
+        self.errors = 0
+        self.duration_ms = 0.0
+        self.latency_mean = 0.0
+        self.latency_m2 = 0.0
+
+    def add(self, keystrokes: int, errors: int, duration_ms: float, completed: bool):
+        """
+        1回分の回答を追加
+
+        Args:
+            keystrokes (int): 打鍵数
+            errors (int): ミス数
+            duration_ms (float): 所要時間（ミリ秒）
+            completed (bool): 正解したかどうか
+        """
+        self.attempts += 1
+        self.completed += int(completed)
+        self.keystrokes += keystrokes
+        self.errors += errors
+        self.duration_ms += duration_ms
+
+        latency = duration_ms / keystrokes
+        delta = latency - self.latency_mean
+        self.latency_mean += delta / self.attempts
+        self.latency_m2 += delta * (latency - self.latency_mean)
+
+    @property
+    def latency_sd(self) -> float:
+        """1打鍵あたり時間の標準偏差（ミリ秒）"""
+        if self.attempts < 2:
+            return 0.0
+        return math.sqrt(self.latency_m2 / (self.attempts - 1))
+
+
+class SessionAggregator:
+    """セッションログを集計して用語の出題重みを計算するクラス"""
+
+    # 平滑化に使う事前打鍵数（回答の少ない用語は全体平均に近づける）
+    PRIOR_KEYSTROKES = 20
+
+    # 重みの計算係数と範囲
+    ERROR_WEIGHT = 1.0
+    LATENCY_WEIGHT = 0.5
+    MIN_WEIGHT = 0.2
+    MAX_WEIGHT = 5.0
+
+    def __init__(self, terms: Iterable[str]):
+        """
+        初期化
+
+        Args:
+            terms (Iterable[str]): 集計対象の用語（デッキの japanese 列）
+        """
+        self.stats: Dict[str, TermStats] = {
+            CSVMerger.normalize_text(term): TermStats() for term in terms
+        }
+        self.records = 0
+        self.skipped = 0
+        self.unknown_terms = 0
+
+    def add_record(self, record: dict):
+        """
+        ログの1レコードを集計
+
+        Args:
+            record (dict): セッションログのレコード
+        """
+        try:
+            term = CSVMerger.normalize_text(record['term'])
+            keystrokes = int(record['keystrokes'])
+            errors = int(record.get('errors', 0))
+            duration_ms = float(record['duration_ms'])
+            completed = record.get('completed', False)
+        except (KeyError, TypeError, ValueError):
+            self.skipped += 1
+            return
+
+        # 負の値・NaN・無限大（"nan"やJSONのNaN）は全体平均を壊すため除外
+        if (keystrokes <= 0 or errors < 0 or not math.isfinite(duration_ms) or duration_ms < 0
+                or not isinstance(completed, bool)):
+            self.skipped += 1
+            return
+
+        stats = self.stats.get(term)
+        if stats is None:
+            # デッキにない用語は保持しない（メモリをデッキの大きさに制限）
+            self.unknown_terms += 1
+            return
+
+        stats.add(keystrokes, min(errors, keystrokes), duration_ms, completed)
+        self.records += 1
+
+    def add_stream(self, stream: TextIO):
+        """
+        NDJSONストリームを1行ずつ集計
+
+        Args:
+            stream (TextIO): NDJSONのテキストストリーム
+        """
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                self.skipped += 1
+                continue
+            if isinstance(record, dict):
+                self.add_record(record)
+            else:
+                self.skipped += 1
+
+    def global_rates(self) -> Tuple[float, float]:
+        """
+        全体のミス率と1打鍵あたり時間
+
+        Returns:
+            Tuple[float, float]: ミス率, 1打鍵あたり時間（ミリ秒）
+        """
+        keystrokes = sum(stats.keystrokes for stats in self.stats.values())
+        if keystrokes == 0:
+            return 0.0, 0.0
+        errors = sum(stats.errors for stats in self.stats.values())
+        duration_ms = sum(stats.duration_ms for stats in self.stats.values())
+        return errors / keystrokes, duration_ms / keystrokes
+
+    def weights(self) -> Dict[str, float]:
+        """
+        用語ごとの出題重みを計算（1.0が平均、苦手な用語ほど大きい）
+
+        Returns:
+            Dict[str, float]: 正規化した用語 → 重み
+        """
+        error_rate, latency = self.global_rates()
+        prior = self.PRIOR_KEYSTROKES
+        weights = {}
+
+        for term, stats in self.stats.items():
+            weight = 1.0
+            if error_rate > 0:
+                smoothed = (stats.errors + prior * error_rate) / (stats.keystrokes + prior)
+                weight += self.ERROR_WEIGHT * (smoothed / error_rate - 1)
+            if latency > 0:
+                smoothed = (stats.duration_ms + prior * latency) / (stats.keystrokes + prior)
+                weight += self.LATENCY_WEIGHT * (smoothed / latency - 1)
+            weights[term] = round(min(max(weight, self.MIN_WEIGHT), self.MAX_WEIGHT), 3)
+
+        return weights
+
+    def write_weighted_deck(self, deck_path: str, output_path: str):
+        """
+        デッキCSVにweight列を追加して保存（行単位で処理）
+
+        Args:
+            deck_path (str): 入力デッキCSVのパス
+            output_path (str): 出力CSVファイルのパス
+        """
+        weights = self.weights()
+
+        with open(deck_path, 'r', encoding='utf-8-sig', newline='') as deckfile, \
+                atomic_write(output_path, 'w', encoding='utf-8', newline='') as csvfile:
+            reader = csv.DictReader(deckfile)
+            fieldnames = list(reader.fieldnames or [])
+            if 'weight' not in fieldnames:
+                fieldnames.append('weight')
+
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in reader:
+                term = CSVMerger.normalize_text(row.get('japanese'))
+                row['weight'] = str(weights.get(term, 1.0))
+                writer.writerow(row)
+
+    def write_stats(self, output_path: str):
+        """
+        用語ごとの集計値をCSVに保存
+
+        Args:
+            output_path (str): 出力CSVファイルのパス
+        """
+        weights = self.weights()
+        with open(output_path, 'w', encoding='utf-8', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow([
+                'japanese', 'attempts', 'completed', 'keystrokes', 'errors',
+                'error_rate', 'latency_mean_ms', 'latency_sd_ms', 'weight',
+            ])
+            for term, stats in self.stats.items():
+                if stats.attempts == 0:
+                    continue
+                writer.writerow([
+                    term, stats.attempts, stats.completed, stats.keystrokes, stats.errors,
+                    round(stats.errors / stats.keystrokes, 4),
+                    round(stats.latency_mean, 1), round(stats.latency_sd, 1),
+                    weights[term],
+                ])
+
+
+def read_deck_terms(deck_path: str) -> Iterator[str]:
+    """
+    デッキCSVの用語を1行ずつ読み込む
+
+    Args:
+        deck_path (str): デッキCSVのパス
+
+    Yields:
+        str: 用語
+    """
+    with open(deck_path, 'r', encoding='utf-8-sig', newline='') as deckfile:
+        for row in csv.DictReader(deckfile):
+            if row.get('japanese'):
+                yield row['japanese']
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(
+        description="セッションログを集計して苦手な用語に重みを付けたCSVを作成",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  python3 session_aggregator.py medical-terms.csv weighted.csv logs/*.ndjson
+  cat logs/*.ndjson | python3 session_aggregator.py medical-terms.csv weighted.csv -
+
+セッションログ:
+  アプリのゲーム終了画面「セッションログを保存」で書き出したNDJSONファイル。
+  1行1用語: {"term": "心電図", "keystrokes": 12, "errors": 2, "duration_ms": 3400, ...}
+
+weight列:
+  1.0が平均で、ミスが多い・時間がかかる用語ほど大きくなります。
+  アプリはweight列があると重み付きで出題順を決めます。
+        """
+    )
+
+    parser.add_argument(
+        'deck_csv',
+        help='用語CSVファイルのパス'
+    )
+
+    parser.add_argument(
+        'output_csv',
+        help='weight列を追加した出力CSVファイルのパス'
+    )
+
+    parser.add_argument(
+        'logs',
+        nargs='+',
+        help='セッションログ（NDJSON）のパス（- で標準入力）'
+    )
+
+    parser.add_argument(
+        '--stats',
+        help='用語ごとの集計値を保存するCSVファイルのパス'
+    )
+
+    args = parser.parse_args()
+
+    # ファイル存在確認
+    for path in [args.deck_csv] + [log for log in args.logs if log != '-']:
+        if not Path(path).exists():
+            print(f"入力ファイルが見つかりません: {path}")
+            sys.exit(1)
+
+    aggregator = SessionAggregator(read_deck_terms(args.deck_csv))
+
+    print("セッションログを集計中...")
+    for log in args.logs:
+        if log == '-':
+            aggregator.add_stream(sys.stdin)
+        else:
+            with open(log, 'r', encoding='utf-8') as logfile:
+                aggregator.add_stream(logfile)
+
+    print(f"集計したレコード数: {aggregator.records}")
+    if aggregator.unknown_terms:
+        print(f"デッキにない用語のレコード数: {aggregator.unknown_terms}")
+    if aggregator.skipped:
+        print(f"不正なレコード数: {aggregator.skipped}")
+
+    aggregator.write_weighted_deck(args.deck_csv, args.output_csv)
+    print(f"CSVファイルを保存しました: {args.output_csv}")
+
+    if args.stats:
+        aggregator.write_stats(args.stats)
+        print(f"集計値を保存しました: {args.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Approximate Heavy-Hitter Counter for Medical Terms
+医療用語の近似頻度集計プログラム
+
+大量のPDF（教科書・論文のライブラリ全体）から医療用語を抽出し、
+Count-Min Sketch と上位候補のヒープで「多くの文書に出現する用語」の上位K件を
+近似的に求めます。用語の種類数に関わらずメモリ使用量は一定で、
+並列ワーカーや別のマシンで作成したスケッチは足し合わせて統合できます。
+
+推定値は真の値以上で、確率 1-δ で「推定値 - 誤差」以上になります
+（誤差 = e / width × 総件数, δ = e^-depth）。
+
+使用方法:
+    python3 term_sketch.py top_terms.csv library/ --top-k 500 --workers 4
+
+依存関係:
+    pip install PyPDF2 pykakasi
+"""
+
+import argparse
+import array
+import contextlib
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from file_utils import atomic_write
+
+
+class TermSketch:
+    """Count-Min Sketch と上位候補ヒープによる用語の近似頻度集計クラス"""
+
+    # スケッチファイルの形式とバージョン
+    SKETCH_FORMAT = 'term-sketch'
+    SKETCH_VERSION = 1
+
+    def __init__(self, top_k: int = 100, width: int = 4096, depth: int = 5,
+                 capacity: Optional[int] = None, seed: int = 0):
+        """
+        初期化
+
+        Args:
+            top_k (int): top()で返す用語数
+            width (int): 1行のカウンタ数（大きいほど誤差が小さい）
+            depth (int): 行数（大きいほど誤差の保証が外れる確率が小さい）
+            capacity (int, optional): 保持する上位候補の数（デフォルト: top_kの4倍）
+            seed (int): ハッシュのシード（統合するスケッチ同士で揃える）
+        """
+        if top_k < 1 or width < 1 or depth < 1:
+            raise ValueError("top_k・width・depthは1以上を指定してください")
+
+        self.top_k = top_k
+        self.width = width
+        self.depth = depth
+        self.capacity = max(capacity or top_k * 4, top_k)
+        self.seed = seed
+        self.total = 0
+
+        # depth × width のカウンタを1本の配列で保持
+        self.counts = array.array('Q', bytes(8 * width * depth))
+
+        # 上位候補: 用語 → 推定値と、最小値を取り出すためのヒープ（古い値は取り出し時に捨てる）
+        self.candidates: Dict[str, int] = {}
+        self.heap: List[Tuple[int, str]] = []
+
+    @property
+    def epsilon(self) -> float:
+        """総件数に対する誤差の割合"""
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        """誤差の保証が外れる確率"""
+        return math.exp(-self.depth)
+
+    @property
+    def error(self) -> int:
+        """現在の総件数での推定値の誤差の上限（頻度は整数のため切り捨て）"""
+        return math.floor(self.epsilon * self.total)
+
+    def indexes(self, term: str) -> List[int]:
+        """
+        用語に対応する各行のカウンタ位置（2つのハッシュ値から各行の値を作る）
+
+        Args:
+            term (str): 用語
+
+        Returns:
+            List[int]: counts配列での位置
+        """
+        digest = hashlib.blake2b(
+            term.encode('utf-8'), digest_size=16, salt=self.seed.to_bytes(16, 'little')
+        ).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def estimate(self, term: str) -> int:
+        """
+        用語の推定頻度（真の値以上）
+
+        Args:
+            term (str): 用語
+
+        Returns:
+            int: 推定頻度
+        """
+        return min(self.counts[index] for index in self.indexes(term))
+
+    def add(self, term: str, count: int = 1):
+        """
+        用語の頻度を加算
+
+        Args:
+            term (str): 用語
+            count (int): 加算する頻度
+        """
+        indexes = self.indexes(term)
+        for index in indexes:
+            self.counts[index] += count
+        self.total += count
+        self.offer(term, min(self.counts[index] for index in indexes))
+
+    def update(self, terms: Iterable[str]):
+        """
+        用語をまとめて1ずつ加算
+
+        Args:
+            terms (Iterable[str]): 用語
+        """
+        for term in terms:
+            self.add(term)
+
+    def offer(self, term: str, estimate: int):
+        """
+        上位候補を更新
+
+        Args:
+            term (str): 用語
+            estimate (int): 用語の推定頻度
+        """
+        if term not in self.candidates and len(self.candidates) >= self.capacity:
+            smallest = self.smallest_candidate()
+            if estimate <= self.candidates[smallest]:
+                return
+            del self.candidates[smallest]
+
+        self.candidates[term] = estimate
+        heapq.heappush(self.heap, (estimate, term))
+
+        # 古い値がたまったらヒープを作り直す（メモリを候補数に比例させる）
+        if len(self.heap) > self.capacity * 4:
+            self.heap = [(value, key) for key, value in self.candidates.items()]
+            heapq.heapify(self.heap)
+
+    def smallest_candidate(self) -> str:
+        """
+        推定頻度が最小の上位候補
+
+        Returns:
+            str: 用語
+        """
+        while True:
+            estimate, term = self.heap[0]
+            if self.candidates.get(term) == estimate:
+                return term
+            heapq.heappop(self.heap)
+
+    def merge(self, other: 'TermSketch'):
+        """
+        別のスケッチを足し合わせる（並列ワーカーの結果の統合）
+
+        Args:
+            other (TermSketch): 同じwidth・depth・seedのスケッチ
+
+        Raises:
+            ValueError: スケッチの設定が異なる場合
+        """
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("width・depth・seedが異なるスケッチは統合できません")
+
+        for index, value in enumerate(other.counts):
+            if value:
+                self.counts[index] += value
+        self.total += other.total
+
+        # 両方の候補を統合後のカウンタで推定し直して上位だけ残す
+        terms = set(self.candidates) | set(other.candidates)
+        self.candidates = {}
+        self.heap = []
+        for term in terms:
+            self.offer(term, self.estimate(term))
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        推定頻度の高い用語
+
+        Args:
+            k (int, optional): 用語数（デフォルト: top_k）
+
+        Returns:
+            List[Tuple[str, int, int]]: (用語, 推定頻度, 下限) のリスト（推定頻度の降順）
+        """
+        error = self.error
+        ranked = sorted(self.candidates.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            (term, estimate, max(estimate - error, 0))
+            for term, estimate in ranked[:k or self.top_k]
+        ]
+
+    def save(self, path: str):
+        """
+        スケッチをJSONファイルに保存（同じディレクトリの一時ファイルから置き換える）
+
+        Args:
+            path (str): 保存先のパス
+        """
+        sketch = {
+            'format': self.SKETCH_FORMAT,
+            'version': self.SKETCH_VERSION,
+            'top_k': self.top_k,
+            'width': self.width,
+            'depth': self.depth,
+            'capacity': self.capacity,
+            'seed': self.seed,
+            'total': self.total,
+            'counts': self.counts.tolist(),
+            'candidates': self.candidates,
+        }
+
+        with atomic_write(path, 'w', encoding='utf-8') as f:
+            json.dump(sketch, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'TermSketch':
+        """
+        JSONファイルからスケッチを読み込む
+
+        Args:
+            path (str): スケッチファイルのパス
+
+        Returns:
+            TermSketch: 読み込んだスケッチ
+
+        Raises:
+            ValueError: 形式またはバージョンが一致しない場合
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if data.get('format') != cls.SKETCH_FORMAT or data.get('version') != cls.SKETCH_VERSION:
+            raise ValueError(f"対応していないスケッチ形式です: {path}")
+        if len(data['counts']) != data['width'] * data['depth']:
+            raise ValueError(f"スケッチのカウンタ数が一致しません: {path}")
+
+        sketch = cls(top_k=data['top_k'], width=data['width'], depth=data['depth'],
+                     capacity=data['capacity'], seed=data['seed'])
+        sketch.total = data['total']
+        sketch.counts = array.array('Q', data['counts'])
+        for term, estimate in data['candidates'].items():
+            sketch.offer(term, estimate)
+        return sketch
+
+
+def find_pdfs(paths: List[str]) -> List[str]:
+    """
+    PDFファイルとディレクトリ（再帰的に検索）からPDFの一覧を作成
+
+    Args:
+        paths (List[str]): PDFファイルまたはディレクトリのパス
+
+    Returns:
+        List[str]: PDFファイルのパス
+    """
+    pdfs = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            pdfs.extend(sorted(str(pdf) for pdf in path.rglob('*') if pdf.suffix.lower() == '.pdf'))
+        else:
+            pdfs.append(str(path))
+    return pdfs
+
+
+def sketch_pdfs_job(pdf_paths: List[str], sketch_args: dict,
+                    snapshot_path: Optional[str] = None) -> Tuple[TermSketch, int]:
+    """
+    ワーカープロセスでPDFの医療用語をスケッチに集計
+
+    Args:
+        pdf_paths (List[str]): 担当するPDFファイルのパス
+        sketch_args (dict): TermSketchの引数
+        snapshot_path (str, optional): 抽出器のスナップショットのパス
+
+    Returns:
+        Tuple[TermSketch, int]: 集計したスケッチと読み込めなかったPDFの数
+    """
+    from pdf_to_csv import MedicalTermExtractor
+
+    sketch = TermSketch(**sketch_args)
+    failed = 0
+
+    # 抽出器の詳細な進捗表示は捨てる（結果は親プロセスでまとめて表示）
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        extractor = MedicalTermExtractor.load(snapshot_path)
+        for pdf_path in pdf_paths:
+            text = extractor.extract_text_from_pdf(pdf_path)
+            if not text.strip():
+                failed += 1
+                continue
+            extractor.extract_medical_terms(text, sketch=sketch)
+
+    return sketch, failed
+
+
+def write_top_terms(sketch: TermSketch, output_path: str):
+    """
+    上位の用語と推定頻度をCSVに保存
+
+    Args:
+        sketch (TermSketch): スケッチ
+        output_path (str): 出力CSVファイルのパス
+    """
+    with open(output_path, 'w', encoding='utf-8', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['japanese', 'documents', 'documents_min'])
+        writer.writerows(sketch.top())
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(
+        description="大量のPDFから出現文書数の多い医療用語を近似的に集計",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  python3 term_sketch.py top_terms.csv library/ --top-k 500 --workers 4
+  python3 term_sketch.py top_terms.csv library/ --save-sketch a.json
+  python3 term_sketch.py top_terms.csv --merge a.json b.json --deck deck.csv
+
+出力CSV:
+  japanese, documents（出現文書数の推定値）, documents_min（誤差を考慮した下限）
+  推定値は真の値以上で、高い確率で下限以上です。
+        """
+    )
+
+    parser.add_argument(
+        'output_csv',
+        help='上位の用語を保存するCSVファイルのパス'
+    )
+
+    parser.add_argument(
+        'inputs',
+        nargs='*',
+        help='PDFファイルまたはPDFを含むディレクトリ'
+    )
+
+    parser.add_argument(
+        '--top-k',
+        type=int,
+        default=100,
+        help='出力する用語数 (デフォルト: 100)'
+    )
+
+    parser.add_argument(
+        '--width',
+        type=int,
+        default=4096,
+        help='スケッチの幅（誤差 = e / width × 総件数）(デフォルト: 4096)'
+    )
+
+    parser.add_argument(
+        '--depth',
+        type=int,
+        default=5,
+        help='スケッチの行数（保証が外れる確率 = e^-depth）(デフォルト: 5)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='並列ワーカー数 (デフォルト: CPU数)'
+    )
+
+    parser.add_argument(
+        '--snapshot',
+        help='ワーカーが読み込む抽出器のスナップショット（JSON）のパス'
+    )
+
+    parser.add_argument(
+        '--merge',
+        nargs='+',
+        default=[],
+        help='統合する保存済みスケッチのパス'
+    )
+
+    parser.add_argument(
+        '--save-sketch',
+        help='統合後のスケッチを保存するパス（後で --merge で統合可能）'
+    )
+
+    parser.add_argument(
+        '--deck',
+        help='上位の用語から作成した用語CSV（読み・ローマ字・意味付き）の保存先'
+    )
+
+    args = parser.parse_args()
+
+    pdf_paths = find_pdfs(args.inputs)
+    for path in pdf_paths + args.merge:
+        if not Path(path).exists():
+            print(f"入力ファイルが見つかりません: {path}")
+            sys.exit(1)
+
+    if not pdf_paths and not args.merge:
+        print("PDFまたはスケッチを指定してください")
+        sys.exit(1)
+
+    sketch_args = {'top_k': args.top_k, 'width': args.width, 'depth': args.depth}
+    try:
+        sketch = TermSketch(**sketch_args)
+        for path in args.merge:
+            sketch.merge(TermSketch.load(path))
+            print(f"スケッチを統合しました: {path}")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"スケッチを統合できません: {e}")
+        sys.exit(1)
+
+    if pdf_paths:
+        # ワーカーごとにPDFを分担し、各ワーカーのスケッチを最後に足し合わせる
+        workers = max(1, min(args.workers, len(pdf_paths)))
+        chunks = [pdf_paths[index::workers] for index in range(workers)]
+        print(f"{len(pdf_paths)}個のPDFを{workers}個のワーカーで集計中...")
+
+        failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(sketch_pdfs_job, chunk, sketch_args, args.snapshot)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                worker_sketch, worker_failed = future.result()
+                sketch.merge(worker_sketch)
+                failed += worker_failed
+
+        if failed:
+            print(f"テキストを抽出できなかったPDF: {failed}個")
+
+    write_top_terms(sketch, args.output_csv)
+    print(f"CSVファイルを保存しました: {args.output_csv}")
+    print(f"集計件数: {sketch.total} (推定値の誤差: +{sketch.error}以内, "
+          f"確率 {1 - sketch.delta:.3f})")
+
+    if args.save_sketch:
+        sketch.save(args.save_sketch)
+        print(f"スケッチを保存しました: {args.save_sketch}")
+
+    if args.deck:
+        from pdf_to_csv import MedicalTermExtractor
+
+        extractor = MedicalTermExtractor()
+        csv_data = extractor.create_csv_data([term for term, _, _ in sketch.top()])
+        extractor.save_to_csv(csv_data, args.deck)
+
+
+if __name__ == "__main__":
+    main()
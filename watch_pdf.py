@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PDF Watch Folder Converter
+PDF監視フォルダ自動変換プログラム
+
+指定したフォルダを監視し、新しく置かれた（または更新された）PDFファイルを
+自動でCSVに変換します。Linuxではinotifyで変更を検知し、それ以外の環境では
+一定間隔でフォルダを確認します。書き込み中のファイルはサイズと更新時刻が
+落ち着くまで待ってから変換し、結果は一時ファイル経由で置き換えるため、
+配信中のCSVが書きかけの状態で読まれることはありません。
+
+使用方法:
+    python3 watch_pdf.py pdf_inbox/ [output_dir/]
+
+依存関係:
+    pip install PyPDF2 pykakasi
+"""
+
+import argparse
+import contextlib
+import ctypes
+import ctypes.util
+import multiprocessing
+import os
+import select
+import signal
+import struct
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# pdf_to_csv.pyからMedicalTermExtractorクラスをインポート
+try:
+    from pdf_to_csv import MedicalTermExtractor
+except ImportError:
+    print("pdf_to_csv.pyが見つかりません。同じディレクトリに配置してください。")
+    sys.exit(1)
+
+
+# ワーカープロセスごとに使い回す抽出器
+# （fork方式では親プロセスで準備したものをそのまま引き継ぐ）
+_worker_extractor: Optional[MedicalTermExtractor] = None
+
+
+def prepare_parent_extractor(snapshot_path: Optional[str] = None):
+    """
+    ワーカー作成前に親プロセスで抽出器を準備（fork方式のワーカーはこれを引き継ぐ）
+
+    Args:
+        snapshot_path (str, optional): スナップショットファイルのパス
+    """
+    global _worker_extractor
+    _worker_extractor = MedicalTermExtractor.load(snapshot_path)
+    _worker_extractor.warm_up()
+
+
+def init_worker(snapshot_path: Optional[str] = None):
+    """
+    ワーカープロセスの初期化（抽出器を1度だけ作成）
+
+    Args:
+        snapshot_path (str, optional): スナップショットファイルのパス
+    """
+    global _worker_extractor
+    # Ctrl+Cは親プロセスが受けて、変換中のジョブの完了を待ってから終了する
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if _worker_extractor is None:
+        # fork以外の方式（macOS・Windows）では親の状態を引き継がないため読み込み直す
+        _worker_extractor = MedicalTermExtractor.load(snapshot_path)
+
+
+def convert_pdf_job(pdf_path: str, output_path: str) -> int:
+    """
+    ワーカープロセスでPDFを変換してCSVを公開
+
+    Args:
+        pdf_path (str): 入力PDFファイルのパス
+        output_path (str): 出力CSVファイルのパス
+
+    Returns:
+        int: 登録された用語数
+
+    Raises:
+        ValueError: テキストまたは医療用語が見つからない場合
+    """
+    extractor = _worker_extractor or MedicalTermExtractor()
+
+    # 抽出器の詳細な進捗表示は捨てる（結果は親プロセスでまとめて表示）
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        text = extractor.extract_text_from_pdf(pdf_path)
+        if not text:
+            raise ValueError("PDFからテキストを抽出できませんでした")
+
+        medical_terms = extractor.extract_medical_terms(text)
+        if not medical_terms:
+            raise ValueError("医療用語が見つかりませんでした")
+
+        csv_data = extractor.create_csv_data(medical_terms)
+        extractor.write_csv(csv_data, output_path)
+
+    return len(csv_data)
+
+
+class PollingWatcher:
+    """一定間隔でフォルダを確認する変更検知クラス（inotifyが使えない環境用）"""
+
+    def __init__(self, directory: str, interval: float = 1.0):
+        """
+        初期化
+
+        Args:
+            directory (str): 監視するフォルダ
+            interval (float): 確認間隔（秒）
+        """
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """
+        フォルダ内のファイルのサイズと更新時刻を取得
+
+        Returns:
+            Dict[str, Tuple[int, int]]: ファイル名 → (サイズ, 更新時刻)
+        """
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    continue
+        return snapshot
+
+    def wait(self, timeout: float) -> List[str]:
+        """
+        変更を待つ
+
+        Args:
+            timeout (float): 最大待ち時間（秒）
+
+        Returns:
+            List[str]: 追加・変更されたファイル名
+        """
+        time.sleep(min(timeout, self.interval))
+        snapshot = self.scan()
+        changed = [name for name, signature in snapshot.items()
+                   if self.snapshot.get(name) != signature]
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        """終了処理"""
+
+
+class InotifyWatcher:
+    """Linuxのinotifyでフォルダの変更を検知するクラス"""
+
+    # inotifyのイベントマスク（<sys/inotify.h>）
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, directory: str):
+        """
+        初期化
+
+        Args:
+            directory (str): 監視するフォルダ
+
+        Raises:
+            OSError: inotifyが使えない場合
+        """
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libcが見つかりません")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotifyはこの環境では使用できません")
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno))
+
+    def wait(self, timeout: float) -> List[str]:
+        """
+        変更を待つ
+
+        Args:
+            timeout (float): 最大待ち時間（秒）
+
+        Returns:
+            List[str]: 追加・変更されたファイル名
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        names = []
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            _, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        """終了処理"""
+        os.close(self.fd)
+
+
+class PDFWatchDaemon:
+    """監視フォルダのPDFをワーカープールで変換するクラス"""
+
+    # ワーカーの異常終了に巻き込まれたPDFを再投入する最大回数
+    MAX_CRASH_RETRIES = 2
+
+    def __init__(self, watch_dir: str, output_dir: str, workers: int = 2,
+                 max_pending: int = 8, settle: float = 2.0,
+                 poll_interval: float = 1.0, use_inotify: bool = True,
+                 snapshot_path: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            watch_dir (str): 監視するフォルダ
+            output_dir (str): CSVを公開するフォルダ（配信中の medical-terms.csv と同じ場所）
+            workers (int): ワーカープロセス数
+            max_pending (int): 同時に投入する変換の最大数
+            settle (float): サイズと更新時刻がこの秒数変わらなければ書き込み完了とみなす
+            poll_interval (float): ポーリング時の確認間隔（秒）
+            use_inotify (bool): inotifyを使うかどうか
+            snapshot_path (str, optional): 抽出器のスナップショットファイルのパス
+        """
+        self.watch_dir = Path(watch_dir)
+        self.output_dir = Path(output_dir)
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.snapshot_path = snapshot_path
+
+        # 書き込み完了待ちのPDF: パス → (サイズと更新時刻, 最後に変化を確認した時刻)
+        self.pending: Dict[Path, Tuple[Tuple[int, int], float]] = {}
+        # 変換中のジョブ: Future → PDFのパス
+        self.running: Dict[Future, Path] = {}
+        # ワーカーの異常終了に巻き込まれた回数: PDFのパス → 回数
+        self.crash_counts: Dict[Path, int] = {}
+        # ワーカープールが使えなくなったかどうか（runで作り直す）
+        self.pool_broken = False
+
+    def create_watcher(self):
+        """
+        変更検知クラスを作成（inotifyが使えなければポーリング）
+
+        Returns:
+            InotifyWatcher | PollingWatcher: 変更検知クラス
+        """
+        if self.use_inotify:
+            try:
+                watcher = InotifyWatcher(str(self.watch_dir))
+                print("inotifyで監視します")
+                return watcher
+            except OSError as e:
+                print(f"inotifyを使用できません（{e}）。ポーリングで監視します")
+        return PollingWatcher(str(self.watch_dir), self.poll_interval)
+
+    @staticmethod
+    def file_signature(path: Path) -> Optional[Tuple[int, int]]:
+        """
+        ファイルのサイズと更新時刻
+
+        Args:
+            path (Path): ファイルのパス
+
+        Returns:
+            Optional[Tuple[int, int]]: (サイズ, 更新時刻)（ファイルがない場合はNone）
+        """
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def output_path(self, pdf_path: Path) -> Path:
+        """PDFに対応する出力CSVのパス"""
+        return self.output_dir / pdf_path.with_suffix('.csv').name
+
+    def is_up_to_date(self, pdf_path: Path) -> bool:
+        """出力CSVがPDFより新しいかどうか"""
+        try:
+            return self.output_path(pdf_path).stat().st_mtime_ns >= pdf_path.stat().st_mtime_ns
+        except OSError:
+            return False
+
+    def mark_changed(self, name: str):
+        """
+        変更されたファイルを書き込み完了待ちに追加
+
+        Args:
+            name (str): 監視フォルダ内のファイル名
+        """
+        if not name.lower().endswith('.pdf'):
+            return
+        path = self.watch_dir / name
+        signature = self.file_signature(path)
+        if signature is not None:
+            self.pending[path] = (signature, time.monotonic())
+
+    def create_executor(self) -> ProcessPoolExecutor:
+        """
+        ワーカープールを作成（各ワーカーはinit_workerで抽出器を準備）
+
+        Returns:
+            ProcessPoolExecutor: ワーカープール
+        """
+        # Linuxでは準備した抽出器を引き継ぐためforkを使う（macOSはforkで子プロセスが
+        # 異常終了することがあるため既定のspawnのまま、init_workerで読み込み直す）
+        mp_context = None
+        if sys.platform.startswith('linux'):
+            mp_context = multiprocessing.get_context('fork')
+
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context,
+                                   initializer=init_worker, initargs=(self.snapshot_path,))
+
+    def check_pending(self, executor: ProcessPoolExecutor):
+        """
+        書き込みが落ち着いたPDFを変換ジョブとして投入
+
+        Args:
+            executor (ProcessPoolExecutor): ワーカープール
+        """
+        now = time.monotonic()
+        for path, (signature, changed_at) in list(self.pending.items()):
+            current = self.file_signature(path)
+            if current is None:
+                # 削除された
+                del self.pending[path]
+            elif current != signature:
+                # まだ書き込み中
+                self.pending[path] = (current, now)
+            elif now - changed_at >= self.settle:
+                if path in self.running.values() or len(self.running) >= self.max_pending:
+                    # 変換中または投入数の上限（次回に再確認）
+                    continue
+                try:
+                    future = executor.submit(convert_pdf_job, str(path), str(self.output_path(path)))
+                except BrokenProcessPool:
+                    # ワーカープールを作り直してから投入する（pendingに残したまま）
+                    self.pool_broken = True
+                    return
+                del self.pending[path]
+                print(f"⏳ 変換開始: {path.name}")
+                self.running[future] = path
+
+    def collect_finished(self):
+        """完了したジョブの結果を表示"""
+        for future in [future for future in self.running if future.done()]:
+            path = self.running.pop(future)
+            try:
+                term_count = future.result()
+                print(f"✓ 変換完了: {path.name} -> {self.output_path(path).name} ({term_count}語)")
+            except BrokenProcessPool:
+                # ワーカーが異常終了した（メモリ不足など）。どのPDFが原因か分からないため
+                # 変換中だったPDFはすべて再投入し、繰り返し巻き込まれたものは諦める
+                self.pool_broken = True
+                crashes = self.crash_counts.get(path, 0) + 1
+                if crashes > self.MAX_CRASH_RETRIES:
+                    self.crash_counts.pop(path, None)
+                    print(f"❌ 変換エラー: {path.name}: ワーカープロセスが繰り返し異常終了しました")
+                else:
+                    self.crash_counts[path] = crashes
+                    print(f"⚠️  ワーカープロセスが異常終了しました。再投入します: {path.name}")
+                    self.mark_changed(path.name)
+                continue
+            except Exception as e:
+                print(f"❌ 変換エラー: {path.name}: {e}")
+            self.crash_counts.pop(path, None)
+
+    def run(self):
+        """監視を開始（Ctrl+Cで終了）"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        watcher = self.create_watcher()
+
+        # 起動時点で未変換（またはCSVより新しい）PDFを対象にする
+        for path in sorted(self.watch_dir.glob('*')):
+            if path.suffix.lower() == '.pdf' and not self.is_up_to_date(path):
+                self.mark_changed(path.name)
+
+        # ワーカー作成前に抽出器を準備して、最初のページまでの待ち時間を減らす
+        prepare_parent_extractor(self.snapshot_path)
+
+        print(f"監視中: {self.watch_dir} -> {self.output_dir}（Ctrl+Cで終了）")
+
+        executor = self.create_executor()
+        try:
+            while True:
+                # 待ち時間は書き込み完了判定の間隔に合わせる
+                timeout = min(self.settle / 2, self.poll_interval) if self.pending or self.running \
+                    else self.poll_interval
+                for name in watcher.wait(timeout):
+                    self.mark_changed(name)
+                self.collect_finished()
+                if self.pool_broken:
+                    print("ワーカープールを作り直します")
+                    executor.shutdown(wait=False)
+                    executor = self.create_executor()
+                    self.pool_broken = False
+                self.check_pending(executor)
+        except KeyboardInterrupt:
+            print("\n監視を終了します（変換中のジョブの完了を待っています）...")
+        finally:
+            watcher.close()
+            executor.shutdown(wait=True)
+
+        self.collect_finished()
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(
+        description="監視フォルダに置かれたPDFを自動でCSVに変換",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用例:
+  python3 watch_pdf.py pdf_inbox/
+  python3 watch_pdf.py pdf_inbox/ decks/ --workers 4
+
+出力:
+  PDFと同じ名前のCSVを出力フォルダ（デフォルト: カレントディレクトリ）に公開します。
+  複数のCSVは merge_csv.py で medical-terms.csv にまとめられます。
+        """
+    )
+
+    parser.add_argument(
+        'watch_dir',
+        help='監視するフォルダ'
+    )
+
+    parser.add_argument(
+        'output_dir',
+        nargs='?',
+        default='.',
+        help='CSVを公開するフォルダ (デフォルト: カレントディレクトリ)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=2,
+        help='ワーカープロセス数 (デフォルト: 2)'
+    )
+
+    parser.add_argument(
+        '--max-pending',
+        type=int,
+        default=8,
+        help='同時に投入する変換の最大数 (デフォルト: 8)'
+    )
+
+    parser.add_argument(
+        '--settle',
+        type=float,
+        default=2.0,
+        help='書き込み完了とみなすまでの秒数 (デフォルト: 2.0)'
+    )
+
+    parser.add_argument(
+        '--snapshot',
+        help='抽出器のスナップショットファイル（pdf_to_csv.py --snapshot で作成）'
+    )
+
+    parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='inotifyを使わずポーリングで監視'
+    )
+
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=1.0,
+        help='ポーリング間隔（秒） (デフォルト: 1.0)'
+    )
+
+    args = parser.parse_args()
+
+    # フォルダ存在確認
+    if not Path(args.watch_dir).is_dir():
+        print(f"監視フォルダが見つかりません: {args.watch_dir}")
+        sys.exit(1)
+
+    if args.workers < 1:
+        print("ワーカープロセス数は1以上を指定してください")
+        sys.exit(1)
+
+    daemon = PDFWatchDaemon(
+        args.watch_dir,
+        args.output_dir,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        settle=args.settle,
+        poll_interval=args.poll_interval,
+        use_inotify=not args.poll,
+        snapshot_path=args.snapshot
+    )
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()